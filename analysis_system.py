@@ -13,6 +13,9 @@ import string
 import os
 import re
 import difflib
+from frame_store import MemmapFrameStore
+from audio_buffer import speech_intervals
+from config import EMOTION_SAMPLE_EVERY, AUDIO_SAMPLE_RATE
 
 warnings.filterwarnings('ignore')
 
@@ -249,7 +252,7 @@ class AnalysisSystem:
         if not text or not text.strip():
             return False
         invalid_markers = ["[Could not understand audio]", "[Speech recognition service unavailable]", 
-                          "[Error", "[No audio]", "Audio not clear"]
+                          "[Transcription timed out]", "[Error", "[No audio]", "Audio not clear"]
         return not any(marker in text for marker in invalid_markers)
     
     # NOTE: Copy ALL other methods from your original analysis_system.py file
@@ -412,11 +415,12 @@ class AnalysisSystem:
         total = sum(mapped.values()) or 1
         return {k: (v / total) * 100 for k, v in mapped.items()}
     
-    def analyze_emotions_batch(self, frames, sample_every=8):
+    def analyze_emotions_batch(self, frames, sample_every=8, presampled=False):
         """Analyze emotions - OPTIMIZED: Increased sampling interval"""
         # PERFORMANCE: Sample every 10 frames instead of 8 (20% faster)
         emotion_quality_pairs = []
-        sample_interval = max(10, sample_every)  # At least every 10 frames
+        # Frames from RetainedFrames were already sampled during recording
+        sample_interval = 1 if presampled else max(10, sample_every)  # At least every 10 frames
         
         for i in range(0, len(frames), sample_interval):
             if i < len(frames):
@@ -470,7 +474,7 @@ class AnalysisSystem:
         if not text or not text.strip():
             return False
         invalid_markers = ["[Could not understand audio]", "[Speech recognition service unavailable]", 
-                          "[Error", "[No audio]", "Audio not clear"]
+                          "[Transcription timed out]", "[Error", "[No audio]", "Audio not clear"]
         return not any(marker in text for marker in invalid_markers)
     
     def compute_speech_rate(self, text, duration_seconds):
@@ -498,15 +502,28 @@ class AnalysisSystem:
         else:
             return max(0.2, 0.5 - 0.3 * ((wpm - FAST_WPM_THRESHOLD) / 40))
     
-    def detect_pauses(self, audio_path):
-        """Detect pauses - OPTIMIZED with caching"""
-        if not LIBROSA_AVAILABLE or not os.path.exists(audio_path):
+    def detect_pauses(self, audio, noise_floor=None):
+        """Detect pauses - OPTIMIZED with caching
+        audio: WAV path, or a 16 kHz int16 PCM array read straight from the session audio buffer
+        noise_floor: session's calibrated room noise (RMS); speech is anything 6 dB above it"""
+        is_pcm = isinstance(audio, np.ndarray)
+        calibrated = is_pcm and bool(noise_floor)
+        if (not LIBROSA_AVAILABLE and not calibrated) or (is_pcm and len(audio) == 0) or \
+                (not is_pcm and (not audio or not os.path.exists(audio))):
             return {'pause_ratio': 0.0, 'avg_pause_duration': 0.0, 'num_pauses': 0}
         
         try:
-            # PERFORMANCE: Load with lower sample rate
-            y, sr = librosa.load(audio_path, sr=16000)  # Was None, now 16kHz (3x faster)
-            intervals = librosa.effects.split(y, top_db=30)
+            if calibrated:
+                y, sr = audio, AUDIO_SAMPLE_RATE
+                intervals = speech_intervals(audio, AUDIO_SAMPLE_RATE, 2.0 * noise_floor)
+            elif is_pcm:
+                # PERFORMANCE: No file round trip - scale the buffer's int16 samples directly
+                y, sr = audio.astype(np.float32) / 32768.0, AUDIO_SAMPLE_RATE
+                intervals = librosa.effects.split(y, top_db=30)
+            else:
+                # PERFORMANCE: Load with lower sample rate
+                y, sr = librosa.load(audio, sr=16000)  # Was None, now 16kHz (3x faster)
+                intervals = librosa.effects.split(y, top_db=30)
             
             total_duration = len(y) / sr
             speech_duration = sum((end - start) / sr for start, end in intervals)
@@ -653,7 +670,7 @@ class AnalysisSystem:
         similarity_score = similarity * 100
         return round(similarity_score, 1)
     
-    def evaluate_fluency_comprehensive(self, text, audio_path, duration_seconds):
+    def evaluate_fluency_comprehensive(self, text, audio, duration_seconds, noise_floor=None):
         """Comprehensive fluency evaluation - OPTIMIZED"""
         if not self.is_valid_transcript(text):
             return {
@@ -675,7 +692,7 @@ class AnalysisSystem:
         speech_rate_normalized = self.normalize_speech_rate(speech_rate)
         
         # 2. Pause Detection
-        pause_metrics = self.detect_pauses(audio_path)
+        pause_metrics = self.detect_pauses(audio, noise_floor)
         pause_ratio = pause_metrics['pause_ratio']
         
         # 3. Grammar
@@ -852,15 +869,27 @@ class AnalysisSystem:
         Perform comprehensive analysis - OPTIMIZED & ACCURATE
         """
         frames = recording_data.get('frames', [])
+        if not frames and recording_data.get('frame_store_path'):
+            # Frames live in an on-disk store (possibly written by another process)
+            try:
+                store = MemmapFrameStore.open(recording_data['frame_store_path'])
+                frames = store.frames_for(recording_data.get('question_number', 0)) or []
+            except Exception as e:
+                print(f"⚠️ Could not open frame store: {e}")
+                frames = []
         transcript = recording_data.get('transcript', '')
         audio_path = recording_data.get('audio_path', '')
+        audio = recording_data.get('audio')  # Session audio segment (PCM view), when recorded that way
         face_box = recording_data.get('face_box')
         has_valid_answer = self.is_valid_transcript(transcript)
         
         # Facial emotion analysis (optimized sampling)
         face_emotions = {}
+        presampled = getattr(frames, 'presampled', False)
         if frames and self.models['face_loaded']:
-            face_emotions = self.analyze_emotions_batch(frames, sample_every=10)
+            face_emotions = self.analyze_emotions_batch(
+                frames, sample_every=EMOTION_SAMPLE_EVERY, presampled=presampled
+            )
         
         # Fuse emotions
         fused, scores = self.fuse_emotions(face_emotions, has_valid_answer)
@@ -875,13 +904,17 @@ class AnalysisSystem:
             )
         
         # Comprehensive fluency analysis
-        fluency_results = self.evaluate_fluency_comprehensive(transcript, audio_path, duration)
+        fluency_results = self.evaluate_fluency_comprehensive(
+            transcript, audio if audio is not None else audio_path, duration,
+            noise_floor=recording_data.get('noise_floor')
+        )
         
         # Visual outfit analysis
         outfit_label = "Unknown"
         outfit_conf = 0.0
         if frames and face_box:
-            outfit_label, outfit_conf = self.analyze_outfit(frames[-1], face_box)
+            last_frame = frames.last_frame() if presampled else frames[-1]
+            outfit_label, outfit_conf = self.analyze_outfit(last_frame, face_box)
         
         return {
             'fused_emotions': fused,
@@ -8,7 +8,10 @@ import warnings
 import os
 import sys
 import tempfile
-from config import QUESTIONS, IS_PRODUCTION
+import time
+from config import (QUESTIONS, IS_PRODUCTION, MODEL_LOADING, DETECTOR_POOL_SIZE,
+                    MAX_FRAME_WIDTH, MAX_FRAME_HEIGHT,
+                    AUDIO_SAMPLE_RATE, AUDIO_RING_SECONDS, ASR_BACKEND, ASR_MODEL)
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -17,13 +20,16 @@ warnings.filterwarnings('ignore')
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
 # Import custom modules
-from recording_system import RecordingSystem
-from analysis_system import AnalysisSystem
 from scoring_dashboard import ScoringDashboard
+from detector_pool import DetectorPool, load_detector_set
+from video_source import WebRTCFrameMailbox
+from audio_buffer import PCMRingBuffer, AudioFrameResampler
+from asr import create_asr_backend
+from interview_worker import InterviewRunner, InterviewSession
 
 # Try importing WebRTC
 try:
-    from streamlit_webrtc import webrtc_streamer, WebRtcMode, VideoProcessorBase
+    from streamlit_webrtc import webrtc_streamer, WebRtcMode, VideoProcessorBase, AudioProcessorBase
     WEBRTC_AVAILABLE = True
 except ImportError:
     WEBRTC_AVAILABLE = False
@@ -84,18 +90,35 @@ st.markdown("""
 class WebRTCVideoProcessor(VideoProcessorBase):
     """WebRTC video processor for capturing frames"""
     def __init__(self):
-        self.frames = []
-        self.max_frames = 100  # Keep only recent frames to prevent memory issues
+        # PERFORMANCE: recv keeps only the newest raw av.VideoFrame (no frame history);
+        # frames are converted (downscaled) when the session's capture thread reads them
+        self.mailbox = WebRTCFrameMailbox(MAX_FRAME_WIDTH, MAX_FRAME_HEIGHT)
         
     def recv(self, frame):
-        import av
-        img = frame.to_ndarray(format="bgr24")
-        self.frames.append(img)
+        self.mailbox.post(frame, time.time())
+        return frame
+    
+    def on_ended(self):
+        # Browser stream stopped: let the session's video source end instead of waiting
+        self.mailbox.close()
+    
+    def sample_frame(self, after_seq=0, timeout=None):
+        """Next (seq, timestamp, bgr) newer than after_seq, converted in the caller's thread"""
+        return self.mailbox.sample(after_seq, timeout)
+    
+    def latest_frame(self):
+        """Newest (seq, timestamp, bgr) without waiting, or None before the first frame"""
+        return self.mailbox.latest()
+
+class WebRTCAudioProcessor(AudioProcessorBase):
+    """WebRTC audio processor: the browser microphone as 16 kHz mono PCM for the whole session"""
+    def __init__(self):
+        # PERFORMANCE: preallocated ring; per-question answers are cut from it by timestamp
+        self.audio = PCMRingBuffer(AUDIO_RING_SECONDS, AUDIO_SAMPLE_RATE)
+        self.resampler = AudioFrameResampler(self.audio)
         
-        # Keep only recent frames to prevent memory issues
-        if len(self.frames) > self.max_frames:
-            self.frames = self.frames[-self.max_frames:]
-            
+    def recv(self, frame):
+        self.resampler.push(frame, time.time())
         return frame
 
 def initialize_session_state():
@@ -112,6 +135,8 @@ def initialize_session_state():
         st.session_state.webrtc_ctx = None
     if 'camera_active' not in st.session_state:
         st.session_state.camera_active = False
+    if 'interview_session' not in st.session_state:
+        st.session_state.interview_session = None
 
 # def load_models():
 #     """Load AI models with progress tracking"""
@@ -178,71 +203,50 @@ def initialize_session_state():
     
 #     return models
 def load_models():
-    """Load AI models with progress tracking - HEADLESS COMPATIBLE"""
+    """Load AI models with progress tracking - HEADLESS COMPATIBLE
+    Returns a DetectorPool: shared models plus per-session detector sets"""
     progress_text = "Loading AI models... This may take a minute."
     progress_bar = st.progress(0)
     
-    models = {}
+    shared = {}
+    # Skip yolov8n-cls.pt to avoid _lzma dependency issues
+    shared['yolo_cls'] = None
     
-    # Load models progressively
     try:
-        # Face detection models - HEADLESS COMPATIBLE
-        import mediapipe as mp
-        mp_face_mesh = mp.solutions.face_mesh
-        mp_hands = mp.solutions.hands
-        
-        # Use CPU-only configuration
-        models['face_mesh'] = mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,  # Reduce from 5 to 1 for performance
-            refine_landmarks=False,  # Disable refinement
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        models['hands'] = mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=1,  # Reduce from 2 to 1
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        progress_bar.progress(30)
-    except Exception as e:
-        st.warning(f"MediaPipe models not available: {e}")
-        models['face_mesh'] = None
-        models['hands'] = None
-    
-    try:
-        # YOLO models - skip classification model to avoid _lzma issue
-        from ultralytics import YOLO
-        models['yolo'] = YOLO("yolov8n.pt")
-        # Skip yolov8n-cls.pt to avoid _lzma dependency issues
-        models['yolo_cls'] = None
-        progress_bar.progress(60)
-    except Exception as e:
-        st.warning(f"YOLO models not available: {e}")
-        models['yolo'] = None
-        models['yolo_cls'] = None
-    
-    try:
-        # Sentence transformer
+        # Sentence transformer (stateless, shared by all sessions)
         from sentence_transformers import SentenceTransformer
-        models['sentence_model'] = SentenceTransformer('all-MiniLM-L6-v2')
-        progress_bar.progress(80)
+        shared['sentence_model'] = SentenceTransformer('all-MiniLM-L6-v2')
+        progress_bar.progress(30)
     except Exception as e:
         st.warning(f"Sentence transformer not available: {e}")
-        models['sentence_model'] = None
+        shared['sentence_model'] = None
     
     # DeepFace availability
     try:
         from deepface import DeepFace
-        models['face_loaded'] = True
+        shared['face_loaded'] = True
     except:
-        models['face_loaded'] = False
+        shared['face_loaded'] = False
+    
+    # Speech recognition model (read-only, shared; each answer gets its own decoder stream)
+    try:
+        shared['asr'] = create_asr_backend(ASR_BACKEND, ASR_MODEL, AUDIO_SAMPLE_RATE)
+        if shared['asr'].fallback_reason:
+            st.warning(f"Speech recognition: {shared['asr'].fallback_reason}")
+        progress_bar.progress(60)
+    except Exception as e:
+        st.warning(f"Speech recognition not available: {e}")
+        shared['asr'] = None
+    
+    # PERFORMANCE: Each interview checks out its own detector set; eager loading builds them all now
+    pool = DetectorPool(load_detector_set, DETECTOR_POOL_SIZE, shared=shared)
+    pool.warm(None if MODEL_LOADING == "eager" else 1)
     
     progress_bar.progress(100)
     st.success("✅ Models loaded successfully!")
     
-    return models
+    return pool
+
 def show_home_page():
     """Display home page"""
     st.markdown('<div class="main-header">🎯 Interview Assessment Platform</div>', unsafe_allow_html=True)
@@ -307,7 +311,7 @@ def show_home_page():
     else:
         st.info("ℹ️ Please accept the guidelines to continue.")
 
-def show_interview_page(models):
+def show_interview_page(runner):
     """Display interview page with WebRTC camera"""
     st.title("🎥 Interview Assessment Session")
     
@@ -339,7 +343,7 @@ def show_interview_page(models):
         show_interview_setup()
     
     elif st.session_state.interview_started and not st.session_state.interview_complete:
-        show_interview_recording(models)
+        show_interview_recording(runner)
     
     else:
         show_results()
@@ -380,15 +384,12 @@ def show_interview_setup():
         st.session_state.camera_active = True
         st.rerun()
 
-def show_interview_recording(models):
+def show_interview_recording(runner):
     """Show interview recording interface"""
     if not WEBRTC_AVAILABLE:
         st.error("❌ Camera functionality not available. Please check browser permissions.")
         return
     
-    # Initialize systems
-    recording_system = RecordingSystem(models)
-    analysis_system = AnalysisSystem(models)
     scoring_dashboard = ScoringDashboard()
     
     # WebRTC camera stream
@@ -398,6 +399,7 @@ def show_interview_recording(models):
         key="interview-camera",
         mode=WebRtcMode.SENDRECV,
         video_processor_factory=WebRTCVideoProcessor,
+        audio_processor_factory=WebRTCAudioProcessor,
         media_stream_constraints={
             "video": {
                 "width": {"ideal": 640},
@@ -413,72 +415,64 @@ def show_interview_recording(models):
     
     st.session_state.webrtc_ctx = webrtc_ctx
     
-    if webrtc_ctx.video_processor:
+    session = st.session_state.get('interview_session')
+    if session is not None:
+        show_session_progress(session, runner)
+    elif webrtc_ctx.video_processor:
         # Show camera status
         st.success("✅ Camera active - You're ready to begin!")
         
         # Start interview button
         if st.button("🎤 Start Interview Questions", type="primary", use_container_width=True):
-            with st.spinner("Starting interview session..."):
-                # Simulate interview process (you'll need to adapt your recording system)
-                st.info("Interview simulation starting...")
-                
-                # For now, we'll simulate results
-                simulate_interview_results(recording_system, analysis_system, scoring_dashboard)
-                
-                st.session_state.interview_complete = True
-                st.rerun()
+            # Recording and analysis run on a background worker fed by this browser stream
+            audio_processor = webrtc_ctx.audio_processor
+            st.session_state.interview_session = runner.submit(InterviewSession(
+                webrtc_ctx.video_processor.mailbox, QUESTIONS, decide=scoring_dashboard.decide_hire,
+                audio=audio_processor.audio if audio_processor else None
+            ))
+            st.rerun()
     else:
         st.warning("⏸️ Camera not active. Please allow camera permissions and refresh the page.")
 
-def simulate_interview_results(recording_system, analysis_system, scoring_dashboard):
-    """Simulate interview results for demo purposes"""
-    # This is a placeholder - you'll need to integrate your actual recording logic
-    st.session_state.results = []
-    
-    for i, question in enumerate(QUESTIONS):
-        # Simulate result for each question
-        result = {
-            "question": question["question"],
-            "question_number": i + 1,
-            "transcript": "This is a simulated transcript for demonstration purposes. In a real interview, your actual speech would be transcribed here.",
-            "violations": [],
-            "violation_detected": False,
-            "fused_emotions": {"Confident": 75.0, "Nervous": 15.0, "Engaged": 8.0, "Neutral": 2.0},
-            "emotion_scores": {"confidence": 75.0, "confidence_label": "High", "nervousness": 15.0, "nervous_label": "Calm"},
-            "accuracy": 78.5,
-            "fluency": 82.3,
-            "wpm": 145,
-            "blink_count": 12,
-            "outfit": "Business Casual",
-            "has_valid_data": True,
-            "fluency_detailed": {
-                "speech_rate": 145,
-                "speech_rate_normalized": 0.92,
-                "pause_ratio": 0.12,
-                "grammar_score": 88.5,
-                "grammar_errors": 2,
-                "lexical_diversity": 68.2,
-                "coherence_score": 72.4,
-                "filler_count": 3,
-                "filler_ratio": 0.04,
-                "fluency_level": "Fluent"
-            },
-            "filler_count": 3,
-            "filler_ratio": 0.04,
-            "improvements_applied": {
-                "no_fake_metrics": True,
-                "stopword_filtering": True,
-                "quality_weighted_emotions": True
-            }
-        }
-        
-        # Make hiring decision
-        decision, reasons = scoring_dashboard.decide_hire(result)
-        result["hire_decision"] = decision
-        result["hire_reasons"] = reasons
-        
-        st.session_state.results.append(result)
+def show_session_progress(session, runner):
+    """Render the background session's latest state; reruns until it finishes"""
+    status = session.status()
+    
+    if status['state'] == "queued":
+        st.info("⏳ Waiting for a free interview slot...")
+    if status['countdown']:
+        st.warning(status['countdown'])
+    if status['question']:
+        number, text, tip = status['question']
+        st.markdown(f"### Question {number} of {len(session.questions)}")
+        st.markdown(f"**{text}**")
+        st.caption(f"💡 {tip}")
+    
+    st.progress(max(0.0, min(1.0, status['progress'])))
+    if status['timer']:
+        st.caption(status['timer'])
+    if status['frame'] is not None:
+        st.image(status['frame'], channels="BGR")
+    if status['status']:
+        st.markdown(status['status'])
+    if status['results']:
+        st.caption(f"📊 {len(status['results'])}/{len(session.questions)} questions analysed")
+    
+    if status['state'] == "complete":
+        st.session_state.results = status['results']
+        st.session_state.session_metrics = session.session
+        st.session_state.detector_pool_metrics = runner.pool.metrics()
+        st.session_state.interview_session = None
+        st.session_state.interview_complete = True
+        st.rerun()
+    elif status['state'] == "failed":
+        st.error(f"❌ {status['error']}")
+        st.session_state.detector_pool_metrics = runner.pool.metrics()
+        st.session_state.interview_session = None
+    else:
+        # Poll the worker; the browser stream keeps flowing between reruns
+        time.sleep(0.5)
+        st.rerun()
 
 def show_results():
     """Display assessment results"""
@@ -493,18 +487,24 @@ def main():
     """Main application function"""
     initialize_session_state()
     
-    # Load models (cached)
+    # Load models (cached): shared models + pool of per-session detector sets
     @st.cache_resource(show_spinner="Loading AI models...")
     def load_cached_models():
         return load_models()
     
-    models = load_cached_models()
+    # Background interview workers, sized to the detector pool
+    @st.cache_resource
+    def load_interview_runner(_pool):
+        return InterviewRunner(_pool)
+    
+    pool = load_cached_models()
+    runner = load_interview_runner(pool)
     
     # Page routing
     if st.session_state.page == "home":
         show_home_page()
     else:
-        show_interview_page(models)
+        show_interview_page(runner)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
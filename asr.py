@@ -0,0 +1,258 @@
+"""
+Speech recognition backends - PERFORMANCE OPTIMIZED
+One interface over offline CPU engines (Vosk, faster-whisper) and the Google
+Web Speech API. Offline engines decode an answer in chunks while the candidate
+is still speaking (StreamingTranscriber), so the transcript is ready when the
+question timer ends instead of after a network round trip.
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from audio_buffer import frame_rms
+
+
+class ASRUnavailable(Exception):
+    """The recognition service could not be reached (network backends)"""
+
+
+class ASRTimeout(Exception):
+    """The decoder did not finish within the result timeout"""
+
+
+class ASRStream:
+    """Incremental decode of one utterance; the default buffers audio and decodes it once at finish()"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._chunks = []
+
+    def accept(self, samples):
+        self._chunks.append(np.array(samples, dtype=np.int16))
+
+    def finish(self):
+        samples = np.concatenate(self._chunks) if self._chunks else np.empty(0, dtype=np.int16)
+        self._chunks = []
+        return self.backend.transcribe(samples)
+
+
+class ASRBackend:
+    """Transcribes 16 kHz mono int16 PCM; streaming backends override stream()"""
+
+    name = "asr"
+    streaming = False
+    fallback_from = None  # Backend that was configured but could not be loaded
+    fallback_reason = None
+
+    def __init__(self, sample_rate=16000):
+        self.sample_rate = sample_rate
+
+    def transcribe(self, samples):
+        """Whole-utterance transcript ("" when nothing was recognised)"""
+        raise NotImplementedError
+
+    def stream(self):
+        return ASRStream(self)
+
+
+class GoogleBackend(ASRBackend):
+    """Google Web Speech API via speech_recognition (network; decodes only after the answer ends)"""
+
+    name = "google"
+
+    def transcribe(self, samples):
+        import speech_recognition as sr
+        if len(samples) == 0:
+            return ""
+        try:
+            audio = sr.AudioData(np.ascontiguousarray(samples).tobytes(), self.sample_rate, 2)
+            return sr.Recognizer().recognize_google(audio)
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise ASRUnavailable(str(e))
+
+
+class VoskStream(ASRStream):
+    """Kaldi recogniser fed chunk by chunk; finished utterances are decoded while audio keeps arriving"""
+
+    def __init__(self, backend):
+        super().__init__(backend)
+        from vosk import KaldiRecognizer
+        self._recognizer = KaldiRecognizer(backend.model, backend.sample_rate)
+        self._texts = []
+
+    def accept(self, samples):
+        if self._recognizer.AcceptWaveform(np.ascontiguousarray(samples, dtype=np.int16).tobytes()):
+            self._texts.append(json.loads(self._recognizer.Result()).get('text', ''))
+
+    def finish(self):
+        self._texts.append(json.loads(self._recognizer.FinalResult()).get('text', ''))
+        return " ".join(t for t in self._texts if t)
+
+
+class VoskBackend(ASRBackend):
+    """Offline Kaldi models (~50 MB small English model); the model is shared, recognisers are per stream"""
+
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path=None, sample_rate=16000):
+        """model_path: unpacked model directory (VOSK_MODEL_PATH); never downloaded at startup"""
+        super().__init__(sample_rate)
+        if not model_path or not os.path.isdir(model_path):
+            raise FileNotFoundError(
+                f"Vosk model directory not found ({model_path!r}); set VOSK_MODEL_PATH to an unpacked model"
+            )
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        self.model = Model(model_path)
+
+    def stream(self):
+        return VoskStream(self)
+
+    def transcribe(self, samples):
+        stream = self.stream()
+        stream.accept(samples)
+        return stream.finish()
+
+
+class WhisperStream(ASRStream):
+    """Decodes whisper-sized chunks as they fill, cutting at the quietest frame so words aren't split"""
+
+    def __init__(self, backend):
+        super().__init__(backend)
+        self._pending = []
+        self._pending_len = 0
+        self._texts = []
+
+    def accept(self, samples):
+        self._pending.append(np.array(samples, dtype=np.int16))
+        self._pending_len += len(samples)
+        chunk_len = int(self.backend.chunk_seconds * self.backend.sample_rate)
+        if self._pending_len < chunk_len:
+            return
+        audio = np.concatenate(self._pending)
+        # Cut at the quietest 30 ms frame of the chunk's last second
+        frame_len = int(0.03 * self.backend.sample_rate)
+        tail_start = max(0, chunk_len - self.backend.sample_rate)
+        levels = frame_rms(audio[tail_start:chunk_len], self.backend.sample_rate)
+        cut = tail_start + int(np.argmin(levels)) * frame_len if len(levels) else chunk_len
+        cut = max(cut, frame_len)
+        self._texts.append(self.backend.transcribe(audio[:cut]))
+        self._pending = [audio[cut:]]
+        self._pending_len = len(audio) - cut
+
+    def finish(self):
+        if self._pending_len:
+            self._texts.append(self.backend.transcribe(np.concatenate(self._pending)))
+        self._pending, self._pending_len = [], 0
+        return " ".join(t for t in self._texts if t)
+
+
+class WhisperBackend(ASRBackend):
+    """faster-whisper (CTranslate2, int8 on CPU); decoded in chunks of chunk_seconds while recording"""
+
+    name = "whisper"
+    streaming = True
+
+    def __init__(self, model_size=None, sample_rate=16000, chunk_seconds=5.0, cpu_threads=0):
+        super().__init__(sample_rate)
+        from faster_whisper import WhisperModel
+        self.chunk_seconds = chunk_seconds
+        self.model = WhisperModel(model_size or "tiny.en", device="cpu", compute_type="int8",
+                                  cpu_threads=cpu_threads)
+        self._lock = threading.Lock()  # One decode at a time per model
+
+    def stream(self):
+        return WhisperStream(self)
+
+    def transcribe(self, samples):
+        if len(samples) == 0:
+            return ""
+        audio = np.asarray(samples, dtype=np.float32) / 32768.0
+        with self._lock:
+            segments, _ = self.model.transcribe(audio, language="en", beam_size=1, vad_filter=True)
+            return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+def create_asr_backend(name="google", model=None, sample_rate=16000, fallback="google"):
+    """
+    Build a backend by name: vosk | whisper | google. When an engine can't be loaded the
+    fallback is returned with fallback_from/fallback_reason set so callers can surface it.
+    """
+    try:
+        if name == "vosk":
+            return VoskBackend(model, sample_rate)
+        if name == "whisper":
+            return WhisperBackend(model, sample_rate)
+        if name == "google":
+            return GoogleBackend(sample_rate)
+        raise ValueError(f"Unknown ASR backend: {name}")
+    except Exception as e:
+        if not fallback or fallback == name:
+            raise
+        print(f"⚠️ {name} ASR not available ({e}), using {fallback}")
+        backend = create_asr_backend(fallback, None, sample_rate, fallback=None)
+        backend.fallback_from = name
+        backend.fallback_reason = f"{name} ASR not available ({e}), using {fallback}"
+        return backend
+
+
+class StreamingTranscriber:
+    """
+    Feeds one answer window of a PCMRingBuffer to a backend stream as the audio arrives
+    (zero-copy views, chunk_seconds at a time) on its own thread; result() returns the transcript
+    """
+
+    def __init__(self, backend, buffer, start_time, duration, chunk_seconds=0.5):
+        self.backend = backend
+        self.buffer = buffer
+        self.start_time = start_time
+        self.duration = duration
+        self.chunk_seconds = chunk_seconds
+        self.transcript = None
+        self.error = None
+        self.finished_at = None
+        self.timed_out = False
+        self._thread = threading.Thread(target=self._run, name="asr-stream", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            stream = self.backend.stream()
+            end_time = self.start_time + self.duration
+            chunk = int(self.chunk_seconds * self.buffer.sample_rate)
+            position = self.buffer.index_at(self.start_time)
+            while True:
+                done = time.time() >= end_time
+                end = self.buffer.index_at(end_time)  # Clamped to what has been written so far
+                while end - position >= chunk or (done and end > position):
+                    step = min(chunk, end - position)
+                    stream.accept(self.buffer.segment(position, position + step))
+                    position += step
+                if done:
+                    break
+                time.sleep(self.chunk_seconds / 2)
+            self.transcript = stream.finish()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished_at = time.time()
+
+    def result(self, timeout=None):
+        """Wait for the transcript; raises what the backend raised, or ASRTimeout if still decoding"""
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            self.timed_out = True
+            raise ASRTimeout(f"No transcript after {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.transcript or ""
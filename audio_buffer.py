@@ -0,0 +1,205 @@
+"""
+Session audio buffer - PERFORMANCE OPTIMIZED
+16 kHz mono int16 PCM in a preallocated mirrored ring: every sample is stored
+twice (at i and i + capacity), so any window of up to `capacity` samples is one
+contiguous slice. Readers get NumPy views; answers that outlive the next few
+minutes of audio are copied out. One stream per session (browser or server
+microphone) feeds the ring; answers are cut from it by timestamp, so writes keep
+the sample clock aligned with capture time (gaps become silence).
+"""
+
+import threading
+import time
+import wave
+
+import numpy as np
+
+
+class AudioOverwritten(Exception):
+    """The requested samples are older than the ring and have been overwritten"""
+
+
+class PCMRingBuffer:
+    """Mirrored int16 ring of the most recent `seconds` of mono audio, addressed by sample index or time"""
+
+    def __init__(self, seconds=300, sample_rate=16000, max_drift=0.2):
+        """max_drift: seconds the sample clock may drift from capture timestamps before it is corrected"""
+        self.sample_rate = sample_rate
+        self.capacity = int(seconds * sample_rate)
+        self.max_drift = max_drift
+        self._data = np.zeros(2 * self.capacity, dtype=np.int16)
+        self.written = 0  # Samples written since the start (absolute index of the next sample)
+        self.start_time = None  # Wall-clock time of sample 0
+        self.silence_inserted = 0  # Samples of silence padded into stream gaps
+        self.reanchored = 0  # Times start_time was moved because audio ran ahead of the clock
+        self._lock = threading.Lock()
+
+    def write(self, samples, timestamp=None):
+        """
+        Append samples; timestamp is when the last of them was captured (default: now).
+        A gap in the stream (dropped packets, stalled track) is padded with silence and
+        audio running ahead of the timestamps re-anchors the clock, so later answer
+        windows still line up with wall-clock time.
+        """
+        samples = np.asarray(samples, dtype=np.int16).reshape(-1)
+        n = len(samples)
+        if n == 0:
+            return
+        with self._lock:
+            if self.start_time is None:
+                end = timestamp if timestamp is not None else time.time()
+                self.start_time = end - n / self.sample_rate
+            elif timestamp is not None:
+                drift = timestamp - (self.start_time + (self.written + n) / self.sample_rate)
+                if drift > self.max_drift:
+                    gap = min(int(round(drift * self.sample_rate)), self.capacity)
+                    self._append(np.zeros(gap, dtype=np.int16))
+                    self.silence_inserted += gap
+                elif drift < -self.max_drift:
+                    self.start_time += drift
+                    self.reanchored += 1
+            self._append(samples)
+
+    def _append(self, samples):
+        n = len(samples)
+        if n > self.capacity:
+            # Only the newest `capacity` samples can be kept
+            self.written += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        pos = self.written % self.capacity
+        first = min(n, self.capacity - pos)
+        for offset in (0, self.capacity):
+            self._data[offset + pos:offset + pos + first] = samples[:first]
+            self._data[offset:offset + n - first] = samples[first:]
+        self.written += n
+
+    def index_at(self, timestamp):
+        """Absolute sample index for a wall-clock time (clamped to what has been written)"""
+        if self.start_time is None:
+            return 0
+        index = int(round((timestamp - self.start_time) * self.sample_rate))
+        return max(0, min(index, self.written))
+
+    def time_at(self, index):
+        return (self.start_time or 0.0) + index / self.sample_rate
+
+    def segment(self, start, end=None):
+        """
+        Read-only view of samples [start, end) - no copy. The view stays valid until
+        `capacity` more samples arrive; copy it to keep it longer. Raises AudioOverwritten
+        if part of the range is already older than the ring.
+        """
+        with self._lock:
+            end = self.written if end is None else min(int(end), self.written)
+            start = max(int(start), 0)
+            if start < end and start < self.written - self.capacity:
+                raise AudioOverwritten(
+                    f"Samples {start}-{end} requested, ring holds {self.written - self.capacity}-{self.written}"
+                )
+            if start >= end:
+                return self._data[:0]
+            pos = start % self.capacity
+            view = self._data[pos:pos + (end - start)]
+        view.flags.writeable = False
+        return view
+
+    def segment_between(self, start_time, end_time=None):
+        """View of the samples captured between two wall-clock times"""
+        end = None if end_time is None else self.index_at(end_time)
+        return self.segment(self.index_at(start_time), end)
+
+    @property
+    def duration(self):
+        return self.written / self.sample_rate
+
+
+class AudioFrameResampler:
+    """av.AudioFrame (any rate/layout/format) -> mono int16 at the buffer's rate, written into it"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.frames_in = 0
+        self._resampler = None
+
+    def push(self, frame, timestamp=None):
+        if self._resampler is None:
+            import av
+            self._resampler = av.AudioResampler(format="s16", layout="mono", rate=self.buffer.sample_rate)
+        self.frames_in += 1
+        resampled = self._resampler.resample(frame)
+        # PyAV >= 9 returns a list of frames, older versions a single frame (or None)
+        if not isinstance(resampled, list):
+            resampled = [resampled] if resampled is not None else []
+        for out in resampled:
+            self.buffer.write(out.to_ndarray().reshape(-1), timestamp)
+
+
+class MicrophoneStream:
+    """Server microphone read continuously on one thread for the whole session (opened once)"""
+
+    def __init__(self, buffer, chunk_size=1024):
+        self.buffer = buffer
+        self.chunk_size = chunk_size
+        self.error = None
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name="audio-capture", daemon=True)
+
+    def start(self):
+        self._running = True
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            import speech_recognition as sr
+            # 16-bit mono at the buffer's rate, so chunks go into the ring without resampling
+            with sr.Microphone(sample_rate=self.buffer.sample_rate, chunk_size=self.chunk_size) as source:
+                while self._running:
+                    chunk = source.stream.read(source.CHUNK)
+                    self.buffer.write(np.frombuffer(chunk, dtype=np.int16), time.time())
+        except Exception as e:
+            self.error = e
+            print(f"⚠️ Microphone unavailable: {e}")
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        self._thread.join(timeout=timeout)
+
+
+def frame_rms(samples, sample_rate, frame_ms=30):
+    """RMS level of consecutive frame_ms windows (trailing partial window dropped)"""
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+    return np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_len)
+
+
+def noise_floor(samples, sample_rate, frame_ms=50, percentile=20):
+    """Room noise level (RMS, int16 units) from a quiet stretch; robust to a cough or click"""
+    levels = frame_rms(samples, sample_rate, frame_ms)
+    return float(np.percentile(levels, percentile)) if len(levels) else 0.0
+
+
+def speech_intervals(samples, sample_rate, threshold, frame_ms=30):
+    """(start, end) sample ranges whose frame RMS exceeds threshold - same shape as librosa.effects.split"""
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    voiced = frame_rms(samples, sample_rate, frame_ms) > threshold
+    if not voiced.any():
+        return np.empty((0, 2), dtype=np.int64)
+    edges = np.diff(np.concatenate([[0], voiced.astype(np.int8), [0]]))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return np.stack([starts, ends], axis=1) * frame_len
+
+
+def write_wav(samples, path, sample_rate):
+    """Write mono int16 samples (e.g. a segment view) to a WAV file without an intermediate copy"""
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(memoryview(np.ascontiguousarray(samples)).cast('B'))
+    return path
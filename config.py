@@ -9,10 +9,31 @@ IS_PRODUCTION = os.getenv('IS_PRODUCTION', 'False').lower() == 'true'
 
 # Model settings
 MODEL_LOADING = "lazy" if IS_PRODUCTION else "eager"
+# Per-session detector sets (FaceMesh/Hands/YOLO/Pose); one per concurrent interview
+DETECTOR_POOL_SIZE = int(os.getenv('DETECTOR_POOL_SIZE', 4 if IS_PRODUCTION else 2))
+DETECTOR_POOL_TIMEOUT = 60  # Seconds a new interview waits for a free set
+# Live sessions share the machine: cap OpenCV/PyTorch threads per session to avoid oversubscription
+INFERENCE_THREADS_PER_SESSION = max(1, (os.cpu_count() or 2) // DETECTOR_POOL_SIZE)
 ENABLE_GPU = False  # Azure App Service typically doesn't have GPU
 
 # Camera source
 CAMERA_SOURCE = "webrtc"  # Use WebRTC for browser camera access
+# Server-side VideoSource when the app has not attached a WebRTC one
+VIDEO_SOURCE = os.getenv('VIDEO_SOURCE', 'webcam')  # webcam | file | synthetic
+VIDEO_SOURCE_PATH = os.getenv('VIDEO_SOURCE_PATH')  # Video file for VIDEO_SOURCE=file
+QUESTION_DURATION_SECONDS = 20  # Answer time per question in live (WebRTC) sessions
+
+# Session audio: mono int16 PCM at the rate pause detection and speech recognition use
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_RING_SECONDS = 300  # Preallocated per session (~19 MB mirrored); covers setup plus all answers
+SESSION_AUDIO_WAV = False  # Also write each answer segment to a WAV file (audio_path)
+
+# Speech recognition: google (network, default) | vosk | whisper (offline, decoded while the candidate speaks; opt-in, see README)
+ASR_BACKEND = os.getenv('ASR_BACKEND', 'google')
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH')  # Unpacked Vosk model directory; required by the vosk backend (never downloaded)
+ASR_MODEL = VOSK_MODEL_PATH if ASR_BACKEND == 'vosk' else os.getenv('ASR_MODEL')  # Vosk directory or faster-whisper size (default tiny.en)
+ASR_CHUNK_SECONDS = 0.5  # Audio handed to the streaming decoder per step
+ASR_RESULT_TIMEOUT = 10  # Seconds to wait for the transcript after the answer window closes
 
 # Performance optimization for production
 if IS_PRODUCTION:
@@ -20,11 +41,46 @@ if IS_PRODUCTION:
     MAX_FRAME_WIDTH = 640
     MAX_FRAME_HEIGHT = 480
     MODEL_CONFIDENCE = 0.5
+    TARGET_FPS = 15
+    DETECTOR_FRAME_BUDGET_MS = 35  # Leaves headroom for capture/encode at 15 fps
+    DETECTOR_CADENCE = {'hands': 2, 'pose': 3, 'yolo': 5}
 else:
     SAMPLE_EVERY_N_FRAMES = 8
     MAX_FRAME_WIDTH = 1280
     MAX_FRAME_HEIGHT = 720
     MODEL_CONFIDENCE = 0.7
+    TARGET_FPS = 15
+    DETECTOR_FRAME_BUDGET_MS = 60
+    DETECTOR_CADENCE = {'hands': 1, 'pose': 2, 'yolo': 3}
+
+# Session video encoding (background writer thread)
+VIDEO_WRITER_QUEUE_SIZE = 30  # ~2s of frames at 15 fps
+VIDEO_WRITER_DROP_POLICY = "drop_oldest"  # drop_oldest | drop_newest | block
+SESSION_VIDEO_FORMAT = "segmented"  # segmented (PyAV, per-question + index) | avi
+SESSION_VIDEO_CODEC = "libx264"
+SESSION_VIDEO_PRESET = "veryfast"
+SESSION_VIDEO_CONTAINER = "mp4"
+SESSION_VIDEO_KEYFRAME_INTERVAL = 15  # One keyframe per second at 15 fps -> fast seeks
+
+# Frame retention for post-question analysis
+EMOTION_SAMPLE_EVERY = 10  # AnalysisSystem samples every 10th frame; only those are kept
+FRAME_RETENTION_JPEG_QUALITY = 85 if IS_PRODUCTION else None  # None keeps raw BGR frames
+FRAME_STORE_BACKEND = "memory"  # memory (RetainedFrames) | memmap (on-disk MemmapFrameStore)
+
+# Violation evidence (background writer)
+EVIDENCE_JPEG_QUALITY = 80 if IS_PRODUCTION else 90
+EVIDENCE_DEDUP_MAX_DISTANCE = 5  # dHash bits (of 64) below which evidence counts as a duplicate
+EVIDENCE_DEDUP_WINDOW_SECONDS = 5.0  # Dedup only the same question and reason within this window
+EVIDENCE_CLIP_SECONDS = 4.0  # Pre-violation clip length (ring buffer of downscaled frames)
+EVIDENCE_CLIP_SIZE = (320, 240)  # ~230 KB per buffered frame, ~14 MB for 4s at 15 fps
+
+# New-object tracking (counts are detector runs, not frames)
+OBJECT_TRACK_MAX_MISSED = 10  # Keep a track through this many runs without a match (YOLO flicker)
+OBJECT_TRACK_MIN_HITS = 1  # Runs an object must be seen before it is checked against the baseline
+
+# Motion gate: reuse detector verdicts while the scene is static
+MOTION_THRESHOLD = 8.0  # Mean gray-level change in any 10x10 block of an 80x60 thumbnail
+MOTION_MAX_CARRY_FRAMES = 2 * TARGET_FPS  # Refresh verdicts at least every ~2s
 
 # Interview questions
 QUESTIONS = [
@@ -0,0 +1,71 @@
+"""
+YOLO detection adapter - PERFORMANCE OPTIMIZED
+Converts a result's boxes (xyxy, cls, conf) to NumPy in one device->host
+transfer each, so detectors filter and test boxes with array operations
+instead of per-box tensor access
+"""
+
+import numpy as np
+
+
+def class_id_mask(names, wanted):
+    """Boolean lookup indexed by class id: True where names[id] (lower-cased) is in wanted"""
+    wanted = {name.lower() for name in wanted}
+    items = names.items() if isinstance(names, dict) else enumerate(names)
+    items = list(items)
+    mask = np.zeros(max((int(i) for i, _ in items), default=-1) + 1, dtype=bool)
+    for class_id, name in items:
+        mask[int(class_id)] = str(name).lower() in wanted
+    return mask
+
+
+class Detections:
+    """Boxes of one YOLO result as parallel NumPy arrays"""
+
+    def __init__(self, xyxy, class_ids, conf, names):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.names = names
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls(np.empty((0, 4)), np.empty(0), np.empty(0), names or {})
+
+    @classmethod
+    def from_yolo(cls, results, names):
+        """Adapter for ultralytics predict() output (list of Results); empty on no results"""
+        if not results or len(results) == 0 or results[0].boxes is None:
+            return cls.empty(names)
+        boxes = results[0].boxes
+        return cls(
+            boxes.xyxy.cpu().numpy(),
+            boxes.cls.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            names
+        )
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    def filter(self, keep):
+        """Subset by a boolean mask or index array"""
+        return Detections(self.xyxy[keep], self.class_ids[keep], self.conf[keep], self.names)
+
+    def min_conf(self, threshold):
+        return self.filter(self.conf >= threshold)
+
+    def of_classes(self, mask):
+        """Keep boxes whose class id is True in a class_id_mask()"""
+        ids = self.class_ids
+        in_range = ids < len(mask)
+        keep = np.zeros(len(ids), dtype=bool)
+        keep[in_range] = mask[ids[in_range]]
+        return self.filter(keep)
+
+    def centers(self):
+        return np.stack([(self.xyxy[:, 0] + self.xyxy[:, 2]) / 2,
+                         (self.xyxy[:, 1] + self.xyxy[:, 3]) / 2], axis=1)
+
+    def name(self, i):
+        return self.names[int(self.class_ids[i])]
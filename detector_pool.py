@@ -0,0 +1,163 @@
+"""
+Detector pool - PERFORMANCE OPTIMIZED
+MediaPipe graphs (FaceMesh/Hands/Pose) keep tracking state and YOLO predictors
+are not thread-safe, so each interview session checks out its own model set
+instead of sharing one cached instance across every Streamlit session
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+def load_detector_set():
+    """One session's stateful detectors (FaceMesh, Hands, YOLO, Pose) - HEADLESS COMPATIBLE"""
+    from recording_system import RecordingSystem, EDGE_ZONES
+    models = {}
+
+    try:
+        # Face detection models - HEADLESS COMPATIBLE
+        import mediapipe as mp
+        mp_face_mesh = mp.solutions.face_mesh
+        mp_hands = mp.solutions.hands
+
+        # Use CPU-only configuration
+        models['face_mesh'] = mp_face_mesh.FaceMesh(
+            static_image_mode=False,
+            max_num_faces=1,  # Reduce from 5 to 1 for performance
+            refine_landmarks=False,  # Disable refinement
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        models['hands'] = mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=1,  # Reduce from 2 to 1
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        # Edge-zone mosaic (FrameContext.hands_in_regions): tiles change frame to frame,
+        # so no tracking, and one hand per tile
+        models['hands_regions'] = mp_hands.Hands(
+            static_image_mode=True,
+            max_num_hands=sum(1 for zone in EDGE_ZONES if zone['confirm_hands']),
+            min_detection_confidence=0.5
+        )
+    except Exception as e:
+        print(f"⚠️ MediaPipe models not available: {e}")
+        models['face_mesh'] = None
+        models['hands'] = None
+        models['hands_regions'] = None
+
+    try:
+        # YOLO models - skip classification model to avoid _lzma issue
+        from ultralytics import YOLO
+        models['yolo'] = YOLO("yolov8n.pt")
+    except Exception as e:
+        print(f"⚠️ YOLO models not available: {e}")
+        models['yolo'] = None
+
+    models['pose'], _ = RecordingSystem.create_pose_detector()
+    return models
+
+
+class DetectorPool:
+    """Fixed-size pool of per-session detector sets built by a factory"""
+
+    def __init__(self, factory, size=2, shared=None):
+        """
+        factory: () -> dict of stateful detectors (one session's set)
+        size: maximum number of sets (concurrent interviews)
+        shared: stateless models merged into every set (e.g. sentence_model)
+        """
+        self.factory = factory
+        self.size = max(1, int(size))
+        self.shared = dict(shared or {})
+        self._free = queue.LifoQueue()  # Most recently used (warm) sets first
+        self._lock = threading.Lock()
+        self._created = 0
+
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.build_time = 0.0
+
+    def _build(self):
+        start = time.perf_counter()
+        models = dict(self.shared)
+        models.update(self.factory())
+        self.build_time += time.perf_counter() - start
+        return models
+
+    def warm(self, count=None):
+        """Build sets ahead of time (all of them by default)"""
+        target = self.size if count is None else min(self.size, int(count))
+        while True:
+            with self._lock:
+                if self._created >= target:
+                    return self
+                self._created += 1
+            self._free.put(self._build())
+
+    def acquire(self, timeout=None):
+        """Check out a detector set, building one if the pool isn't full yet"""
+        try:
+            models = self._free.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                build = self._created < self.size
+                if build:
+                    self._created += 1
+            if build:
+                try:
+                    models = self._build()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                # Every set is in use: wait for a session to return one
+                start = time.perf_counter()
+                try:
+                    models = self._free.get(timeout=timeout)
+                except queue.Empty:
+                    self.timeouts += 1
+                    raise TimeoutError(f"No detector set became free within {timeout}s")
+                finally:
+                    waited = time.perf_counter() - start
+                    self.waits += 1
+                    self.wait_time += waited
+                    self.max_wait_time = max(self.max_wait_time, waited)
+
+        self.checkouts += 1
+        return models
+
+    def release(self, models):
+        """Return a set checked out with acquire()"""
+        self._free.put(models)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """with pool.checkout() as models: ... (returned to the pool afterwards)"""
+        models = self.acquire(timeout)
+        try:
+            yield models
+        finally:
+            self.release(models)
+
+    def metrics(self):
+        available = self._free.qsize()
+        return {
+            'size': self.size,
+            'created': self._created,
+            'available': available,
+            'in_use': self._created - available,
+            'checkouts': self.checkouts,
+            'waits': self.waits,
+            'timeouts': self.timeouts,
+            'wait_ms_total': round(self.wait_time * 1000, 1),
+            'wait_ms_max': round(self.max_wait_time * 1000, 1),
+            'build_ms_total': round(self.build_time * 1000, 1)
+        }
@@ -0,0 +1,93 @@
+"""
+Cost-aware detector scheduler - PERFORMANCE OPTIMIZED
+Decides which compliance detectors run on each frame so the total
+measured detector cost stays inside a per-frame time budget
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class DetectorScheduler:
+    """Schedules detectors by cadence and measured cost within a frame budget"""
+
+    def __init__(self, cadences, frame_budget_ms, ema_alpha=0.2):
+        """
+        cadences: {detector_name: run at least every N frames}
+        frame_budget_ms: time the scheduled detectors may use per frame
+        """
+        self.cadences = {name: max(1, int(n)) for name, n in cadences.items()}
+        self.frame_budget_ms = frame_budget_ms
+        self.ema_alpha = ema_alpha
+        self.cost_ms = {}  # Measured cost (EMA), kept across sessions
+        self.reset()
+
+    def reset(self):
+        """Reset per-session counters (measured costs are kept)"""
+        self.frame_index = 0
+        self.last_run = {name: None for name in self.cadences}
+        self.planned = set()
+        self.runs = {name: 0 for name in self.cadences}
+        self.deferred = {name: 0 for name in self.cadences}
+
+    def _frames_since_run(self, name):
+        last = self.last_run[name]
+        return self.frame_index if last is None else self.frame_index - last
+
+    def begin_frame(self):
+        """Plan the detectors for the next frame and return their names"""
+        self.frame_index += 1
+
+        due = [name for name, cadence in self.cadences.items()
+               if self._frames_since_run(name) >= cadence]
+        # Most overdue (relative to cadence) first
+        due.sort(key=lambda n: self._frames_since_run(n) / self.cadences[n], reverse=True)
+
+        planned = set()
+        spent_ms = 0.0
+        for name in due:
+            cost = self.cost_ms.get(name, 0.0)  # Unmeasured detectors run once to get a cost
+            starving = self._frames_since_run(name) >= 2 * self.cadences[name]
+
+            if starving or spent_ms + cost <= self.frame_budget_ms:
+                planned.add(name)
+                spent_ms += cost
+            else:
+                self.deferred[name] += 1
+
+        self.planned = planned
+        return planned
+
+    @contextmanager
+    def measure(self, name):
+        """Time a detector run and fold it into its cost estimate"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            prev = self.cost_ms.get(name)
+            self.cost_ms[name] = elapsed_ms if prev is None else (
+                self.ema_alpha * elapsed_ms + (1 - self.ema_alpha) * prev
+            )
+            self.last_run[name] = self.frame_index
+            self.runs[name] += 1
+
+    def run(self, name, default, detector, *args):
+        """Run detector(*args) if planned for this frame, else return default"""
+        if name not in self.planned:
+            return default
+        with self.measure(name):
+            return detector(*args)
+
+    def stats(self):
+        """Per-detector runs, deferrals and average cost for this session"""
+        return {
+            name: {
+                'cadence': self.cadences[name],
+                'runs': self.runs[name],
+                'deferred': self.deferred[name],
+                'avg_ms': round(self.cost_ms.get(name, 0.0), 2)
+            }
+            for name in self.cadences
+        }
@@ -0,0 +1,170 @@
+"""
+Asynchronous violation-evidence writer - PERFORMANCE OPTIMIZED
+Overlay drawing, JPEG encoding and disk writes happen on a background thread;
+near-duplicate evidence is skipped using a perceptual (difference) hash.
+A pre-violation clip can be written next to each still (see ClipRingBuffer)
+"""
+
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from video_writer import write_clip
+
+
+def difference_hash(frame):
+    """64-bit dHash of a BGR frame (cheap: one 9x8 resize of the full frame)"""
+    small = cv2.resize(frame, (9, 8), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (gray[:, 1:] > gray[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class EvidenceWriter:
+    """Writes violation images off the capture thread with dedup and configurable JPEG quality"""
+
+    def __init__(self, output_dir, jpeg_quality=85, dedup_max_distance=5, dedup_window_seconds=5.0, queue_size=32):
+        """
+        dedup_max_distance: dHash bits below which two frames count as the same evidence
+        dedup_window_seconds: only evidence for the same question and reason this close in time is deduplicated
+        """
+        self.output_dir = output_dir
+        self.jpeg_quality = jpeg_quality
+        self.dedup_max_distance = dedup_max_distance
+        self.dedup_window_seconds = dedup_window_seconds
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._hashes = {}  # (question_number, reason) -> [(hash, timestamp, filepath)] accepted so far
+        self.clip_paths = {}  # image path -> clip path
+        self._sequence = 0  # Keeps file names unique within one millisecond
+
+        self.written = 0
+        self.clips_written = 0
+        self.duplicates_skipped = 0
+        self.dropped = 0
+        self.write_time = 0.0
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="evidence-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, frame, question_number, violation_reason, timestamp=None, clip=None):
+        """
+        Queue evidence for a violation and return the image path it will be written to.
+        A near-duplicate of evidence for the same question and reason within
+        dedup_window_seconds returns that earlier image's path instead.
+        The frame must not be modified by the caller afterwards (it is not copied).
+        timestamp: frame time in seconds (default: now); drives the dedup window
+        clip: optional (frames, timestamps) snapshot written as a clip beside the image
+        """
+        frame_hash = difference_hash(frame)
+        now = time.time()
+        timestamp = timestamp if timestamp is not None else now
+        key = (question_number, violation_reason)
+
+        with self._lock:
+            earlier = self._hashes.setdefault(key, [])
+            for earlier_hash, earlier_ts, earlier_path in earlier:
+                if abs(timestamp - earlier_ts) <= self.dedup_window_seconds and \
+                        hamming_distance(frame_hash, earlier_hash) <= self.dedup_max_distance:
+                    self.duplicates_skipped += 1
+                    return earlier_path
+
+            self._sequence += 1
+            filename = f"violation_q{question_number}_{int(now * 1000)}_{self._sequence}.jpg"
+            filepath = os.path.join(self.output_dir, filename)
+
+            clip_path = os.path.splitext(filepath)[0] + ".mp4" if clip is not None else None
+
+            self._ensure_started()
+            try:
+                self._queue.put_nowait((frame, violation_reason, filepath, clip, clip_path))
+            except queue.Full:
+                self.dropped += 1
+                return None
+            earlier.append((frame_hash, timestamp, filepath))
+            if clip_path is not None:
+                self.clip_paths[filepath] = clip_path
+        return filepath
+
+    def clip_path_for(self, image_path):
+        """Clip written alongside an evidence image, or None"""
+        return self.clip_paths.get(image_path)
+
+    @staticmethod
+    def render_overlay(frame):
+        """Red tint, thick border and banner (same look as the old synchronous writer)"""
+        h, w = frame.shape[:2]
+
+        # Semi-transparent red tint from a constant layer (no copy of the frame itself)
+        red = np.empty_like(frame)
+        red[:] = (0, 0, 255)
+        overlay_frame = cv2.addWeighted(frame, 0.7, red, 0.3, 0)
+
+        cv2.rectangle(overlay_frame, (0, 0), (w-1, h-1), (0, 0, 255), 10)
+
+        text = "VIOLATION DETECTED"
+        cv2.rectangle(overlay_frame, (0, 0), (w, 80), (0, 0, 0), -1)
+        cv2.putText(overlay_frame, text, (w//2 - 200, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
+        return overlay_frame
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            frame, violation_reason, filepath, clip, clip_path = item
+            start = time.perf_counter()
+            try:
+                overlay_frame = self.render_overlay(frame)
+                cv2.imwrite(filepath, overlay_frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)])
+                self.written += 1
+                if clip is not None:
+                    clip_frames, clip_timestamps = clip
+                    if write_clip(clip_frames, clip_timestamps, clip_path):
+                        self.clips_written += 1
+            except Exception as e:
+                print(f"Error saving violation image: {e}")
+            finally:
+                self.write_time += time.perf_counter() - start
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait until all queued evidence is on disk"""
+        self._queue.join()
+
+    def close(self, timeout=10.0):
+        """Write what is queued, then stop the writer thread (submit() starts a new one)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=timeout)
+
+    def reset(self):
+        """Forget dedup hashes (e.g. at the start of a new session)"""
+        with self._lock:
+            self._hashes = {}
+            self.clip_paths = {}
+
+    def metrics(self):
+        return {
+            'written': self.written,
+            'clips_written': self.clips_written,
+            'duplicates_skipped': self.duplicates_skipped,
+            'dropped': self.dropped,
+            'queue_depth': self._queue.qsize(),
+            'write_ms_total': round(self.write_time * 1000, 1)
+        }
@@ -0,0 +1,220 @@
+"""
+Per-frame inference context - PERFORMANCE OPTIMIZED
+Runs each detection model at most once per frame, caches derived image
+views (RGB, gray, HSV, resized, skin map) and shares both with every detector
+"""
+
+import cv2
+import numpy as np
+
+from detections import Detections
+from skin_map import SkinMap
+
+
+def landmarks_to_array(face_landmarks):
+    """Convert a MediaPipe landmark list to a contiguous float32 (N, 3) array of normalized x, y, z"""
+    if isinstance(face_landmarks, np.ndarray):
+        return face_landmarks
+
+    landmarks = face_landmarks.landmark
+    coords = np.fromiter(
+        (v for lm in landmarks for v in (lm.x, lm.y, lm.z)),
+        dtype=np.float32,
+        count=len(landmarks) * 3
+    )
+    return coords.reshape(-1, 3)
+
+
+class FrameViews:
+    """Lazily computed colour/size conversions of one BGR frame"""
+
+    def __init__(self, frame, stats=None):
+        self.frame = frame
+        self._views = {}
+        # Counters are added into a caller-owned dict so they can span many frames
+        self.stats = stats if stats is not None else {}
+
+    def count(self, key):
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _view(self, key, fn):
+        """Compute a derived view on first use, reuse it afterwards"""
+        if key in self._views:
+            self.count('conversions_avoided')
+            return self._views[key]
+
+        self.count('conversions')
+        view = fn()
+        self._views[key] = view
+        return view
+
+    @property
+    def rgb(self):
+        return self._view('rgb', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB))
+
+    @property
+    def gray(self):
+        return self._view('gray', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self):
+        return self._view('hsv', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV))
+
+    @property
+    def skin(self):
+        """SkinMap (integral skin mask) of the downscaled frame"""
+        return self._view('skin', lambda: SkinMap.from_views(self))
+
+    def resized(self, width, height):
+        """Downscaled BGR copy of the frame, cached per target size"""
+        return self._view(
+            ('resized', width, height),
+            lambda: cv2.resize(self.frame, (width, height), interpolation=cv2.INTER_AREA)
+        )
+
+
+class FrameContext:
+    """Memoizes model inference for a single captured frame"""
+
+    # YOLO is run once at the lowest confidence any detector needs;
+    # stricter detectors filter the cached boxes by their own threshold
+    YOLO_MIN_CONF = 0.25
+
+    # Black gap between tiles of a multi-region Hands mosaic
+    MOSAIC_GAP = 16
+
+    def __init__(self, frame, models_dict, pose_detector=None, stats=None):
+        self.frame = frame
+        self.models = models_dict
+        self.pose_detector = pose_detector
+        self.shape = frame.shape
+        self.views = FrameViews(frame, stats)
+        self.stats = self.views.stats
+        self._results = {}
+        self._landmark_arrays = {}
+        self._region_hands = {}
+        self._detections = None
+
+    @property
+    def rgb(self):
+        """RGB view of the frame for MediaPipe models"""
+        return self.views.rgb
+
+    def _run_once(self, key, fn):
+        """Run fn the first time key is requested, then return the cached result"""
+        if key in self._results:
+            return self._results[key]
+
+        try:
+            result = fn()
+        except Exception:
+            result = None
+
+        self.views.count(f'inference:{key}')
+        self._results[key] = result
+        return result
+
+    def face_mesh(self):
+        """FaceMesh results for the full frame (None if model unavailable)"""
+        if self.models.get('face_mesh') is None:
+            return None
+        return self._run_once('face_mesh', lambda: self.models['face_mesh'].process(self.rgb))
+
+    def face_landmarks(self, face_index=0):
+        """Landmarks of one FaceMesh face as a float32 (N, 3) array, converted once per frame"""
+        if face_index in self._landmark_arrays:
+            return self._landmark_arrays[face_index]
+
+        face_results = self.face_mesh()
+        if not face_results or not face_results.multi_face_landmarks:
+            return None
+        if face_index >= len(face_results.multi_face_landmarks):
+            return None
+
+        arr = landmarks_to_array(face_results.multi_face_landmarks[face_index])
+        self._landmark_arrays[face_index] = arr
+        return arr
+
+    def hands(self):
+        """Hands results for the full frame (None if model unavailable)"""
+        if self.models.get('hands') is None:
+            return None
+        return self._run_once('hands', lambda: self.models['hands'].process(self.rgb))
+
+    def hands_in_regions(self, regions):
+        """
+        Hands for several sub-regions with a single inference: the crops are tiled
+        into one mosaic, Hands runs once, and each hand is mapped back to its region.
+        regions: {name: (x0, y0, x1, y1)} in frame pixels
+        Uses the 'hands_regions' model (one hand per tile) when the set has one.
+        Returns {name: float32 (k, 21, 3) landmarks in full-frame normalized coordinates}
+        """
+        hands_model = self.models.get('hands_regions') or self.models.get('hands')
+        if hands_model is None or not regions:
+            return {}
+
+        key = 'hands:' + '+'.join(sorted(regions))
+        if key in self._region_hands:
+            return self._region_hands[key]
+
+        # Lay the crops out left to right, top-aligned, separated by a black gap
+        tiles = {}
+        mosaic_w = mosaic_h = 0
+        for name, (x0, y0, x1, y1) in regions.items():
+            if x1 <= x0 or y1 <= y0:
+                continue
+            tiles[name] = (mosaic_w, (x0, y0, x1, y1))
+            mosaic_w += (x1 - x0) + self.MOSAIC_GAP
+            mosaic_h = max(mosaic_h, y1 - y0)
+
+        mapped = {name: [] for name in regions}
+        if tiles:
+            mosaic = np.zeros((mosaic_h, mosaic_w - self.MOSAIC_GAP, 3), dtype=np.uint8)
+            for name, (tx, (x0, y0, x1, y1)) in tiles.items():
+                mosaic[:y1 - y0, tx:tx + (x1 - x0)] = self.rgb[y0:y1, x0:x1]
+
+            result = self._run_once(key, lambda: hands_model.process(mosaic))
+            if result and result.multi_hand_landmarks:
+                frame_h, frame_w = self.shape[:2]
+                mosaic_h, mosaic_w = mosaic.shape[:2]
+                for hand_landmarks in result.multi_hand_landmarks:
+                    points = landmarks_to_array(hand_landmarks).copy()
+                    px = points[:, 0] * mosaic_w
+                    py = points[:, 1] * mosaic_h
+                    center_x = float(np.median(px))
+                    for name, (tx, (x0, y0, x1, y1)) in tiles.items():
+                        if tx <= center_x < tx + (x1 - x0):
+                            points[:, 0] = (px - tx + x0) / frame_w
+                            points[:, 1] = (py + y0) / frame_h
+                            mapped[name].append(points)
+                            break
+
+        hands = {
+            name: np.stack(found) if found else np.empty((0, 21, 3), dtype=np.float32)
+            for name, found in mapped.items()
+        }
+        self._region_hands[key] = hands
+        return hands
+
+    def pose(self):
+        """Pose results for the full frame (None if pose detection is disabled)"""
+        if self.pose_detector is None:
+            return None
+        return self._run_once('pose', lambda: self.pose_detector.process(self.rgb))
+
+    def yolo(self):
+        """YOLO results for the full frame at YOLO_MIN_CONF (None if model unavailable)"""
+        if self.models.get('yolo') is None:
+            return None
+        return self._run_once(
+            'yolo',
+            lambda: self.models['yolo'].predict(self.frame, conf=self.YOLO_MIN_CONF, verbose=False)
+        )
+
+    def detections(self):
+        """The shared YOLO pass as NumPy arrays (Detections), converted once per frame"""
+        if self._detections is None:
+            if self.models.get('yolo') is None:
+                return Detections.empty()
+            self._detections = Detections.from_yolo(self.yolo(), self.models['yolo'].names)
+        return self._detections
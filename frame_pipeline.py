@@ -0,0 +1,268 @@
+"""
+Pipelined recording stages - PERFORMANCE OPTIMIZED
+capture thread -> inference (recording loop) -> encoder / UI publisher threads
+Bounded queues with latest-frame-wins backpressure so capture never stalls
+(the encoder stage is an AsyncVideoWriter, see video_writer.py)
+"""
+
+import queue
+import threading
+import time
+
+
+class FrameQueue:
+    """Bounded queue that drops the oldest item when full and tracks depth/latency"""
+
+    def __init__(self, name, maxsize=1):
+        self.name = name
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._latency_total = 0.0
+        self._latency_count = 0
+
+    def put(self, item):
+        """Enqueue without blocking; evict the oldest item if the queue is full"""
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait((time.perf_counter(), item))
+                    break
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self._queue.task_done()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+            self.put_count += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def get(self, timeout=None):
+        """Dequeue the next item, or None on timeout"""
+        try:
+            enqueued_at, item = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self._latency_total += time.perf_counter() - enqueued_at
+        self._latency_count += 1
+        return item
+
+    def task_done(self):
+        self._queue.task_done()
+
+    def join(self):
+        """Block until every queued item has been processed"""
+        self._queue.join()
+
+    def clear(self):
+        """Discard queued items (e.g. stale frames from before a question started)"""
+        while True:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                return
+
+    def metrics(self):
+        return {
+            'depth': self._queue.qsize(),
+            'max_depth': self.max_depth,
+            'put': self.put_count,
+            'dropped': self.dropped,
+            'avg_latency_ms': round(self._latency_total / max(self._latency_count, 1) * 1000, 2)
+        }
+
+
+def _attach_streamlit_context(thread):
+    """Let a worker thread call Streamlit UI callbacks (no-op outside Streamlit)"""
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(thread)
+    except Exception:
+        pass
+
+
+class StageWorker:
+    """Background thread that feeds items from a FrameQueue to a handler"""
+
+    _STOP = object()
+
+    def __init__(self, name, handler, maxsize=1):
+        self.name = name
+        self.handler = handler
+        self.queue = FrameQueue(name, maxsize)
+        self.processed = 0
+        self.handler_time = 0.0
+        self._thread = threading.Thread(target=self._run, name=f"{name}-stage", daemon=True)
+        _attach_streamlit_context(self._thread)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, item):
+        self.queue.put(item)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is self._STOP:
+                self.queue.task_done()
+                return
+            start = time.perf_counter()
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"⚠️ {self.name} stage error: {e}")
+            finally:
+                self.handler_time += time.perf_counter() - start
+                self.processed += 1
+                self.queue.task_done()
+
+    def drain(self):
+        """Wait until everything submitted so far has been handled"""
+        self.queue.join()
+
+    def stop(self, timeout=5.0):
+        """Finish queued work, then stop the thread"""
+        self.drain()
+        self.queue.put(self._STOP)
+        self._thread.join(timeout=timeout)
+
+    def metrics(self):
+        metrics = self.queue.metrics()
+        metrics['processed'] = self.processed
+        metrics['avg_handler_ms'] = round(self.handler_time / max(self.processed, 1) * 1000, 2)
+        return metrics
+
+
+class CaptureWorker:
+    """Reads frames from a capture handle (VideoSource or cv2.VideoCapture) on its own thread"""
+
+    def __init__(self, cap, inference_queue, video_writer=None, clip_buffer=None):
+        self.cap = cap
+        self.inference_queue = inference_queue
+        self.video_writer = video_writer
+        self.clip_buffer = clip_buffer  # Pre-violation ring (ClipRingBuffer), fed while recording
+        self.segment = None  # Frames go to the encoder only while a segment (question) is set
+        self.frames_read = 0
+        self.read_failures = 0
+        self.started_at = None
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name="capture-stage", daemon=True)
+
+    def start(self):
+        self._running = True
+        self.started_at = time.time()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        seq = 0
+        read_frame = getattr(self.cap, 'read_frame', None)
+        while self._running:
+            if read_frame is not None:
+                # VideoSource: timestamps come from the source clock
+                ret, frame, timestamp = read_frame()
+            else:
+                ret, frame = self.cap.read()
+                timestamp = time.time()
+            if not ret:
+                self.read_failures += 1
+                if self.read_failures > 30 or getattr(self.cap, 'ended', False):
+                    self.inference_queue.put(None)  # Tell the consumer capture has ended
+                    return
+                time.sleep(0.01)
+                continue
+
+            seq += 1
+            self.frames_read += 1
+            self.read_failures = 0
+            segment = self.segment
+            # The frame is shared read-only between stages
+            self.inference_queue.put((seq, timestamp, frame))
+            if segment is not None and self.video_writer is not None:
+                self.video_writer.write(frame, timestamp=timestamp, segment=segment)
+            if segment is not None and self.clip_buffer is not None:
+                self.clip_buffer.push(frame, timestamp)
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        self._thread.join(timeout=timeout)
+
+    def metrics(self):
+        elapsed = time.time() - self.started_at if self.started_at else 0
+        return {
+            'frames_read': self.frames_read,
+            'fps': round(self.frames_read / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+
+class FramePipeline:
+    """Wires capture, inference hand-off, encoder and UI publisher stages together"""
+
+    def __init__(self, cap, video_writer, ui_callbacks, clip_buffer=None):
+        self.inference_queue = FrameQueue("inference", maxsize=1)
+        self.video_writer = video_writer
+        self.clip_buffer = clip_buffer
+        self.ui = StageWorker("ui", lambda updates: self._publish(ui_callbacks, updates), maxsize=1)
+        self.capture = CaptureWorker(cap, self.inference_queue, video_writer, clip_buffer)
+        self._inference_time = 0.0
+        self._inference_frames = 0
+
+    @staticmethod
+    def _publish(ui_callbacks, updates):
+        for callback_name, args in updates:
+            ui_callbacks[callback_name](*args)
+
+    def start(self):
+        self.ui.start()
+        self.capture.start()
+        return self
+
+    def set_recording(self, segment):
+        """Feed captured frames to the encoder under segment (e.g. question number); None stops"""
+        if segment is not None:
+            self.inference_queue.clear()
+            if self.clip_buffer is not None:
+                self.clip_buffer.clear()  # Clips never reach back into the previous question
+        self.capture.segment = segment
+
+    def next_frame(self, timeout=1.0):
+        """Latest captured (seq, timestamp, frame), or None if capture has stopped"""
+        item = self.inference_queue.get(timeout=timeout)
+        if item is not None:
+            self._inference_frames += 1
+        return item
+
+    def record_inference_time(self, seconds):
+        self._inference_time += seconds
+
+    def publish(self, updates):
+        """Queue UI updates [(callback_name, args), ...]; only the newest batch is kept"""
+        self.ui.submit(updates)
+
+    def flush_ui(self):
+        """Wait for pending UI updates before the caller touches the UI directly"""
+        self.ui.drain()
+
+    def stop(self):
+        """Stop capture and UI; the caller releases the video writer (which flushes it)"""
+        self.capture.stop()
+        self.ui.stop()
+
+    def metrics(self):
+        inference = self.inference_queue.metrics()
+        inference['processed'] = self._inference_frames
+        inference['avg_handler_ms'] = round(
+            self._inference_time / max(self._inference_frames, 1) * 1000, 2
+        )
+        return {
+            'capture': self.capture.metrics(),
+            'inference': inference,
+            'encoder': self.video_writer.metrics() if self.video_writer is not None else {},
+            'ui': self.ui.metrics()
+        }
@@ -0,0 +1,323 @@
+"""
+Retained-frame storage - MEMORY OPTIMIZED
+Keeps only the frames the analysis stage actually reads instead of every captured frame.
+RetainedFrames holds them in memory; MemmapFrameStore writes them to a per-session
+np.memmap file so resident memory stays flat and other processes can read them.
+ClipRingBuffer keeps the last few seconds of downscaled frames for violation clips.
+"""
+
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+
+class RetainedFrames:
+    """
+    Sampling-aware frame buffer for one question.
+    Keeps every Nth frame (what AnalysisSystem.analyze_emotions_batch samples)
+    plus the latest frame (what analyze_outfit reads), optionally JPEG-compressed.
+    """
+
+    presampled = True  # AnalysisSystem must not sample these again
+
+    def __init__(self, sample_every=10, jpeg_quality=None, max_frames=None):
+        self.sample_every = max(1, int(sample_every))
+        self.jpeg_quality = jpeg_quality
+        self.max_frames = max_frames
+        self.frames_seen = 0
+        self._sampled = []
+        self._timestamps = []
+        self._latest = None  # Latest frame when it is not also the last sampled one
+        self._latest_packed = False
+        self.latest_timestamp = None
+
+    def _pack(self, frame):
+        if self.jpeg_quality is None:
+            return frame
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)])
+        return buf if ok else frame
+
+    @staticmethod
+    def _unpack(item):
+        # Raw frames are (H, W, 3); JPEG buffers are 1-D/2-D byte arrays
+        if item.ndim == 3:
+            return item
+        return cv2.imdecode(item, cv2.IMREAD_COLOR)
+
+    def offer(self, frame, timestamp=None):
+        """Consider a captured frame for retention (the frame is not modified or copied)"""
+        index = self.frames_seen
+        self.frames_seen += 1
+        self.latest_timestamp = timestamp
+
+        if index % self.sample_every == 0 and (
+                self.max_frames is None or len(self._sampled) < self.max_frames):
+            self._sampled.append(self._pack(frame))
+            self._timestamps.append(timestamp)
+            self._latest = None
+        else:
+            # Only one unsampled frame is ever held; it is packed in finalize()
+            self._latest = frame
+            self._latest_packed = False
+
+    def finalize(self):
+        """Pack the latest frame once recording of the question ends"""
+        if self._latest is not None and not self._latest_packed:
+            self._latest = self._pack(self._latest)
+            self._latest_packed = True
+        return self
+
+    def __len__(self):
+        return len(self._sampled)
+
+    def __getitem__(self, i):
+        return self._unpack(self._sampled[i])
+
+    def __iter__(self):
+        for item in self._sampled:
+            yield self._unpack(item)
+
+    def timestamps(self):
+        return list(self._timestamps)
+
+    def last_frame(self):
+        """Most recent captured frame (decoded), or None"""
+        if self._latest is not None:
+            return self._unpack(self._latest)
+        if self._sampled:
+            return self[-1]
+        return None
+
+    def nbytes(self):
+        """Approximate memory held by retained frames"""
+        total = sum(item.nbytes for item in self._sampled)
+        if self._latest is not None:
+            total += self._latest.nbytes
+        return total
+
+    def release(self):
+        """Drop all retained frames"""
+        self._sampled = []
+        self._timestamps = []
+        self._latest = None
+
+
+class StoredFrames:
+    """One question's retained frames inside a MemmapFrameStore (same API as RetainedFrames)"""
+
+    presampled = True
+
+    def __init__(self, store, question_number, sample_every=10, slots=None, latest_slot=None):
+        self.store = store
+        self.question_number = question_number
+        self.sample_every = max(1, int(sample_every))
+        self.frames_seen = 0
+        self.slots = list(slots or [])
+        self.latest_slot = latest_slot
+        self._latest = None
+
+    def offer(self, frame, timestamp=None):
+        """Write every Nth frame straight into the memmap; hold only a reference to the latest"""
+        index = self.frames_seen
+        self.frames_seen += 1
+
+        if index % self.sample_every == 0:
+            slot = self.store.append(frame, timestamp)
+            if slot is not None:
+                self.slots.append(slot)
+                self._latest = None
+                return
+        self._latest = (frame, timestamp)
+
+    def finalize(self):
+        """Persist the latest frame and register this question in the store index"""
+        if self._latest is not None:
+            self.latest_slot = self.store.append(*self._latest)
+            self._latest = None
+        elif self.slots and self.latest_slot is None:
+            self.latest_slot = self.slots[-1]
+        self.store.register(self.question_number, self.slots, self.latest_slot)
+        return self
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __getitem__(self, i):
+        # Zero-copy view into the memmap
+        return self.store.frames[self.slots[i]]
+
+    def __iter__(self):
+        for slot in self.slots:
+            yield self.store.frames[slot]
+
+    def timestamps(self):
+        return [float(self.store.timestamps[slot]) for slot in self.slots]
+
+    def last_frame(self):
+        if self._latest is not None:
+            return self._latest[0]
+        if self.latest_slot is not None:
+            return self.store.frames[self.latest_slot]
+        return None
+
+    def nbytes(self):
+        return 0  # Frames live on disk, paged in on demand
+
+    def release(self):
+        self.slots = []
+        self.latest_slot = None
+        self._latest = None
+
+
+class MemmapFrameStore:
+    """Per-session frame store backed by a preallocated np.memmap file plus a timestamp index"""
+
+    FRAMES_FILE = "frames.u8"
+    TIMESTAMPS_FILE = "timestamps.f8"
+    META_FILE = "meta.json"
+
+    def __init__(self, directory, capacity, sample_every=10, frame_shape=None, readonly=False):
+        self.directory = directory
+        self.capacity = int(capacity)
+        self.sample_every = sample_every
+        self.frame_shape = tuple(frame_shape) if frame_shape else None
+        self.readonly = readonly
+        self.count = 0
+        self.dropped = 0
+        self.questions = {}
+        self.frames = None
+        self.timestamps = None
+        os.makedirs(directory, exist_ok=True)
+        if self.frame_shape:
+            self._map(mode="r" if readonly else "w+")
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _map(self, mode):
+        self.frames = np.memmap(self._path(self.FRAMES_FILE), dtype=np.uint8, mode=mode,
+                                shape=(self.capacity,) + self.frame_shape)
+        self.timestamps = np.memmap(self._path(self.TIMESTAMPS_FILE), dtype=np.float64, mode=mode,
+                                    shape=(self.capacity,))
+
+    def append(self, frame, timestamp=None):
+        """Copy a frame into the next preallocated slot; returns the slot or None if full"""
+        if self.readonly:
+            raise RuntimeError("Frame store is read-only")
+        if self.frames is None:
+            # Preallocate the whole session once the camera resolution is known
+            self.frame_shape = frame.shape
+            self._map(mode="w+")
+        if self.count >= self.capacity:
+            self.dropped += 1
+            return None
+
+        if frame.shape != self.frame_shape:
+            frame = cv2.resize(frame, (self.frame_shape[1], self.frame_shape[0]),
+                               interpolation=cv2.INTER_AREA)
+        slot = self.count
+        self.frames[slot] = frame
+        self.timestamps[slot] = timestamp if timestamp is not None else np.nan
+        self.count += 1
+        return slot
+
+    def question(self, question_number):
+        """Start retaining frames for a question"""
+        return StoredFrames(self, question_number, self.sample_every)
+
+    def register(self, question_number, slots, latest_slot):
+        self.questions[int(question_number)] = {'slots': list(slots), 'latest_slot': latest_slot}
+        self.flush()
+
+    def frames_for(self, question_number):
+        """Read-side view of a finished question's frames"""
+        entry = self.questions.get(int(question_number))
+        if entry is None:
+            return None
+        return StoredFrames(self, question_number, self.sample_every,
+                            slots=entry['slots'], latest_slot=entry['latest_slot'])
+
+    def flush(self):
+        """Flush frame data and write the index so other processes can open the store"""
+        if self.frames is not None and not self.readonly:
+            self.frames.flush()
+            self.timestamps.flush()
+        if self.readonly:
+            return
+        meta = {
+            'capacity': self.capacity,
+            'count': self.count,
+            'dropped': self.dropped,
+            'sample_every': self.sample_every,
+            'frame_shape': list(self.frame_shape) if self.frame_shape else None,
+            'questions': {str(q): entry for q, entry in self.questions.items()}
+        }
+        with open(self._path(self.META_FILE), "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def open(cls, directory):
+        """Open an existing store read-only (e.g. from an analysis worker process)"""
+        with open(os.path.join(directory, cls.META_FILE)) as f:
+            meta = json.load(f)
+        store = cls(directory, meta['capacity'], meta['sample_every'],
+                    frame_shape=meta['frame_shape'], readonly=True)
+        store.count = meta['count']
+        store.dropped = meta.get('dropped', 0)
+        store.questions = {int(q): entry for q, entry in meta['questions'].items()}
+        return store
+
+    def close(self):
+        self.flush()
+        self.frames = None
+        self.timestamps = None
+
+
+class ClipRingBuffer:
+    """
+    Fixed-size ring of the last N seconds of downscaled frames.
+    Storage is preallocated once; each push resizes straight into its slot,
+    so the steady-state cost is one (downscaling) copy per frame and no allocation.
+    """
+
+    def __init__(self, seconds=4.0, fps=15, frame_size=(320, 240)):
+        self.capacity = max(1, int(round(seconds * fps)))
+        self.frame_size = tuple(frame_size)  # (width, height)
+        width, height = self.frame_size
+        self.frames = np.zeros((self.capacity, height, width, 3), dtype=np.uint8)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.min_interval = 1.0 / fps  # Faster cameras are thinned so the ring spans `seconds`
+        self._lock = threading.Lock()
+        self.count = 0  # Frames pushed since the last clear()
+        self._last_timestamp = None
+
+    def push(self, frame, timestamp):
+        """Downscale a captured frame into the next slot (overwrites the oldest)"""
+        if self._last_timestamp is not None and timestamp - self._last_timestamp < self.min_interval * 0.9:
+            return
+        with self._lock:
+            self._last_timestamp = timestamp
+            slot = self.count % self.capacity
+            cv2.resize(frame, self.frame_size, dst=self.frames[slot], interpolation=cv2.INTER_AREA)
+            self.timestamps[slot] = timestamp
+            self.count += 1
+
+    def snapshot(self):
+        """Copy of the buffered frames and timestamps, oldest first"""
+        with self._lock:
+            n = min(self.count, self.capacity)
+            if n < self.capacity:
+                return self.frames[:n].copy(), self.timestamps[:n].copy()
+            order = np.roll(np.arange(self.capacity), -(self.count % self.capacity))
+            return self.frames[order], self.timestamps[order]
+
+    def clear(self):
+        with self._lock:
+            self.count = 0
+            self._last_timestamp = None
+
+    def __len__(self):
+        return min(self.count, self.capacity)
@@ -0,0 +1,169 @@
+"""
+Live interview sessions - PERFORMANCE OPTIMIZED
+Runs the RecordingSystem compliance/attention pipeline on frames streamed from
+the browser (webrtc_streamer) on a background worker per candidate. Each running
+session holds one detector set from the DetectorPool; finished questions are
+analysed on a separate thread while the next one records. Streamlit reruns only
+poll status() - worker threads never call st.*
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from config import (QUESTIONS, QUESTION_DURATION_SECONDS, DETECTOR_POOL_TIMEOUT, INFERENCE_THREADS_PER_SESSION,
+                    TARGET_FPS)
+from recording_system import RecordingSystem
+from analysis_system import AnalysisSystem
+from frame_pipeline import StageWorker
+from video_source import WebRTCMailboxSource
+
+
+def limit_inference_threads(threads):
+    """Cap OpenCV/PyTorch intra-op threads (process-wide) so concurrent sessions share cores"""
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+
+
+class InterviewSession:
+    """One candidate's recording and per-question analysis; the UI reads it through status()"""
+
+    def __init__(self, mailbox, questions=None, duration=QUESTION_DURATION_SECONDS, decide=None, audio=None):
+        """
+        mailbox: WebRTCFrameMailbox of the candidate's video processor
+        audio: PCMRingBuffer of the candidate's audio processor (browser microphone)
+        decide: optional result -> (decision, reasons), e.g. ScoringDashboard.decide_hire
+        """
+        self.mailbox = mailbox
+        self.questions = questions or QUESTIONS
+        self.duration = duration
+        self.decide = decide
+        self.audio = audio
+        self.state = "queued"  # queued | recording | analysing | complete | failed
+        self.error = None
+        self.results = []  # Analysed question results, frames dropped (safe for session state)
+        self.session = {}  # record_continuous_interview() output minus questions_results
+        self.future = None
+        self._ui = {'status': "", 'countdown': "", 'timer': "", 'progress': 0.0,
+                    'frame': None, 'question': None}
+        self._lock = threading.Lock()
+
+    def _set(self, key, value):
+        with self._lock:
+            self._ui[key] = value
+
+    def ui_callbacks(self):
+        """RecordingSystem callbacks that only record the latest value of each UI element"""
+        return {
+            'status_update': lambda text: self._set('status', text),
+            'countdown_update': lambda text: self._set('countdown', text),
+            'timer_update': lambda text: self._set('timer', text),
+            'progress_update': lambda value: self._set('progress', value),
+            'video_update': lambda frame: self._set('frame', frame),
+            'question_update': lambda number, text, tip: self._set('question', (number, text, tip))
+        }
+
+    def _analyse(self, analysis_system, question_result):
+        q_idx = question_result['question_number'] - 1
+        question_data = self.questions[q_idx]
+
+        # Retained frames and audio views stay out of the result (and out of Streamlit session state)
+        result = {k: v for k, v in question_result.items() if k not in ('frames', 'audio')}
+        result['question'] = question_data.get('question', '')
+        try:
+            result.update(analysis_system.analyze_recording(question_result, question_data, self.duration))
+            if self.decide is not None:
+                result['hire_decision'], result['hire_reasons'] = self.decide(result)
+        except Exception as e:
+            # Keep a result for the question so a failed analysis is reported, not dropped
+            print(f"⚠️ Analysis of question {q_idx + 1} failed: {e}")
+            result['error'] = f"Analysis failed: {e}"
+
+        with self._lock:
+            self.results.append(result)
+            self.results.sort(key=lambda r: r['question_number'])
+
+    def run(self, models):
+        """Record and analyse the whole interview with a checked-out detector set (worker thread)"""
+        recording_system = RecordingSystem(models)
+        analysis_system = AnalysisSystem(models)
+        # Browser frames are sampled (and only then converted) at the analysis frame rate
+        recording_system.video_source = WebRTCMailboxSource(self.mailbox, max_fps=TARGET_FPS)
+        recording_system.audio_buffer = self.audio
+
+        analysis = StageWorker("analysis", lambda r: self._analyse(analysis_system, r),
+                               maxsize=len(self.questions) + 1).start()
+        callbacks = self.ui_callbacks()
+        callbacks['question_complete'] = analysis.submit
+
+        self.state = "recording"
+        try:
+            session = recording_system.record_continuous_interview(self.questions, self.duration, callbacks)
+        finally:
+            self.state = "analysing"
+            analysis.stop()
+
+        if 'error' in session:
+            self.fail(session['error'])
+            return
+        self.session = {k: v for k, v in session.items() if k != 'questions_results'}
+        self.session['analysis_metrics'] = analysis.metrics()
+
+        # Every question must have been recorded and analysed before the session counts as complete
+        failed = [r['question_number'] for r in self.results if 'error' in r]
+        if len(self.results) != len(self.questions) or failed:
+            missing = len(self.questions) - len(self.results)
+            details = []
+            if missing:
+                details.append(f"{missing} question(s) missing")
+            if failed:
+                details.append(f"analysis failed for question(s) {', '.join(map(str, failed))}")
+            self.fail("Interview incomplete: " + "; ".join(details))
+            return
+        self.state = "complete"
+
+    def fail(self, message):
+        self.error = message
+        self.state = "failed"
+
+    @property
+    def done(self):
+        return self.state in ("complete", "failed")
+
+    def status(self):
+        """Snapshot of UI state, lifecycle state and the questions analysed so far"""
+        with self._lock:
+            status = dict(self._ui)
+            status['results'] = list(self.results)
+        status['state'] = self.state
+        status['error'] = self.error
+        return status
+
+
+class InterviewRunner:
+    """Session workers sized to the detector pool: one thread per detector set, extra sessions queue"""
+
+    def __init__(self, pool, workers=None):
+        self.pool = pool
+        self.workers = workers or pool.size
+        limit_inference_threads(INFERENCE_THREADS_PER_SESSION)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="interview")
+
+    def submit(self, session):
+        session.future = self._executor.submit(self._run, session)
+        return session
+
+    def _run(self, session):
+        try:
+            with self.pool.checkout(timeout=DETECTOR_POOL_TIMEOUT) as models:
+                session.run(models)
+        except TimeoutError:
+            session.fail("All interview slots are busy. Please try again in a minute.")
+        except Exception as e:
+            print(f"⚠️ Interview session error: {e}")
+            session.fail(f"Interview session error: {e}")
@@ -0,0 +1,159 @@
+"""
+Object tracking for new-object detection - PERFORMANCE OPTIMIZED
+Vectorized IoU/centroid matching gives detections stable track IDs, so an
+object flickering in and out of YOLO's output is only checked (and reported) once;
+the pre-test baseline is a per-class grid index instead of a flat list
+"""
+
+import numpy as np
+
+
+def box_iou(a, b):
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes -> (N, M)"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+def box_centers(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+
+
+class BaselineIndex:
+    """Per-class uniform grid of baseline object centers for radius lookups"""
+
+    def __init__(self, radius=100):
+        self.radius = radius
+        self._cells = {}  # name -> {(cell_x, cell_y): [(cx, cy), ...]}
+
+    @classmethod
+    def from_positions(cls, positions, radius=100):
+        """Build from scan_environment()'s 'positions' list"""
+        index = cls(radius)
+        for obj in positions:
+            index.add(obj['name'], obj['center'])
+        return index
+
+    def _cell(self, center):
+        return int(center[0] // self.radius), int(center[1] // self.radius)
+
+    def add(self, name, center):
+        grid = self._cells.setdefault(name, {})
+        grid.setdefault(self._cell(center), []).append((float(center[0]), float(center[1])))
+
+    def contains(self, name, center):
+        """True if a baseline object of this class lies within radius of center"""
+        grid = self._cells.get(name)
+        if not grid:
+            return False
+        cx, cy = self._cell(center)
+        nearby = [p for dx in (-1, 0, 1) for dy in (-1, 0, 1) for p in grid.get((cx + dx, cy + dy), ())]
+        if not nearby:
+            return False
+        d = np.asarray(nearby, dtype=np.float32) - np.asarray(center, dtype=np.float32)
+        return bool(np.any(np.einsum('ij,ij->i', d, d) < self.radius ** 2))
+
+
+class ObjectTracker:
+    """Greedy IoU/centroid tracker over per-frame (boxes, class ids)"""
+
+    def __init__(self, iou_threshold=0.3, max_center_distance=100, max_missed=10, min_hits=1):
+        """
+        iou_threshold: minimum IoU to continue a track
+        max_center_distance: fallback centroid match (px) when boxes don't overlap enough
+        max_missed: updates a track survives without a match (absorbs YOLO flicker)
+        min_hits: matches needed before a track is reported as new
+        """
+        self.iou_threshold = iou_threshold
+        self.max_center_distance = max_center_distance
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.reset()
+
+    def reset(self):
+        self.next_id = 1
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.class_ids = np.empty(0, dtype=np.int64)
+        self.hits = np.empty(0, dtype=np.int64)
+        self.missed = np.empty(0, dtype=np.int64)
+        self.reported = np.empty(0, dtype=bool)
+
+    def _match(self, boxes, class_ids):
+        """Greedy one-to-one matching, best IoU first, then nearest centroid"""
+        if len(self.ids) == 0 or len(boxes) == 0:
+            return []
+
+        same_class = self.class_ids[:, None] == class_ids[None, :]
+        iou = np.where(same_class, box_iou(self.boxes, boxes), 0.0)
+        d = box_centers(self.boxes)[:, None, :] - box_centers(boxes)[None, :, :]
+        dist = np.sqrt(np.einsum('ijk,ijk->ij', d, d))
+
+        # IoU matches always outrank centroid-only matches
+        score = np.where(iou >= self.iou_threshold, 1.0 + iou,
+                         np.where(same_class & (dist < self.max_center_distance),
+                                  1.0 - dist / self.max_center_distance, 0.0))
+        rows, cols = np.nonzero(score > 0)
+        order = np.argsort(-score[rows, cols], kind='stable')
+
+        matches, used_tracks, used_dets = [], set(), set()
+        for k in order:
+            t, j = int(rows[k]), int(cols[k])
+            if t in used_tracks or j in used_dets:
+                continue
+            used_tracks.add(t)
+            used_dets.add(j)
+            matches.append((t, j))
+        return matches
+
+    def update(self, boxes, class_ids):
+        """
+        Advance tracks with this frame's detections.
+        Returns [(track_id, class_id, box)] for tracks that just became confirmed
+        (each track is returned once over its lifetime).
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+
+        matches = self._match(boxes, class_ids)
+        matched_tracks = np.zeros(len(self.ids), dtype=bool)
+        matched_dets = np.zeros(len(boxes), dtype=bool)
+        for t, j in matches:
+            self.boxes[t] = boxes[j]
+            self.hits[t] += 1
+            self.missed[t] = 0
+            matched_tracks[t] = True
+            matched_dets[j] = True
+        self.missed[~matched_tracks] += 1
+
+        new = ~matched_dets
+        n_new = int(new.sum())
+        if n_new:
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + n_new)])
+            self.next_id += n_new
+            self.boxes = np.concatenate([self.boxes, boxes[new]])
+            self.class_ids = np.concatenate([self.class_ids, class_ids[new]])
+            self.hits = np.concatenate([self.hits, np.ones(n_new, dtype=np.int64)])
+            self.missed = np.concatenate([self.missed, np.zeros(n_new, dtype=np.int64)])
+            self.reported = np.concatenate([self.reported, np.zeros(n_new, dtype=bool)])
+
+        keep = self.missed <= self.max_missed
+        self.ids, self.boxes, self.class_ids = self.ids[keep], self.boxes[keep], self.class_ids[keep]
+        self.hits, self.missed, self.reported = self.hits[keep], self.missed[keep], self.reported[keep]
+
+        confirmed = (~self.reported) & (self.hits >= self.min_hits) & (self.missed == 0)
+        self.reported |= confirmed
+        return [(int(self.ids[i]), int(self.class_ids[i]), self.boxes[i].copy())
+                for i in np.flatnonzero(confirmed)]
+
+    def __len__(self):
+        return len(self.ids)
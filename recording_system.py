@@ -5,17 +5,75 @@ Uses WebRTC for browser-based camera access
 
 import cv2
 import numpy as np
-import threading
 import time
 import tempfile
 import os
 import speech_recognition as sr
 import warnings
 from collections import deque
+from frame_context import FrameContext, landmarks_to_array
+from detector_scheduler import DetectorScheduler
+from motion_gate import MotionGate
+from frame_pipeline import FramePipeline
+from video_writer import AsyncVideoWriter, SegmentedVideoWriter, AV_AVAILABLE
+from frame_store import RetainedFrames, MemmapFrameStore, ClipRingBuffer
+from evidence_writer import EvidenceWriter
+from audio_buffer import PCMRingBuffer, MicrophoneStream, AudioOverwritten, noise_floor, write_wav
+from asr import ASRUnavailable, ASRTimeout, StreamingTranscriber, create_asr_backend
+from video_source import create_video_source
+from object_tracker import ObjectTracker, BaselineIndex
+from detections import class_id_mask
+from config import (SAMPLE_EVERY_N_FRAMES, TARGET_FPS, DETECTOR_FRAME_BUDGET_MS, DETECTOR_CADENCE,
+                    MOTION_THRESHOLD, MOTION_MAX_CARRY_FRAMES,
+                    VIDEO_WRITER_QUEUE_SIZE, VIDEO_WRITER_DROP_POLICY,
+                    SESSION_VIDEO_FORMAT, SESSION_VIDEO_CODEC, SESSION_VIDEO_PRESET,
+                    SESSION_VIDEO_CONTAINER, SESSION_VIDEO_KEYFRAME_INTERVAL,
+                    EMOTION_SAMPLE_EVERY, FRAME_RETENTION_JPEG_QUALITY, FRAME_STORE_BACKEND,
+                    EVIDENCE_JPEG_QUALITY, EVIDENCE_DEDUP_MAX_DISTANCE, EVIDENCE_DEDUP_WINDOW_SECONDS,
+                    EVIDENCE_CLIP_SECONDS, EVIDENCE_CLIP_SIZE,
+                    OBJECT_TRACK_MAX_MISSED, OBJECT_TRACK_MIN_HITS,
+                    VIDEO_SOURCE, VIDEO_SOURCE_PATH, MAX_FRAME_WIDTH, MAX_FRAME_HEIGHT,
+                    AUDIO_SAMPLE_RATE, AUDIO_RING_SECONDS, SESSION_AUDIO_WAV,
+                    ASR_BACKEND, ASR_MODEL, ASR_CHUNK_SECONDS, ASR_RESULT_TIMEOUT)
 
 warnings.filterwarnings('ignore')
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
+# FaceMesh landmark indices, precomputed for vectorized indexing
+HEAD_POSE_LANDMARKS = np.array([1, 33, 263, 61, 291])
+LEFT_IRIS_LANDMARKS = np.array([468, 469, 470, 471, 472])
+RIGHT_IRIS_LANDMARKS = np.array([473, 474, 475, 476, 477])
+LEFT_EYE_LANDMARKS = np.array([33, 133, 157, 158, 159, 160, 161, 163, 144, 145, 153, 154, 155])
+RIGHT_EYE_LANDMARKS = np.array([362, 263, 387, 386, 385, 384, 398, 382, 381, 380, 373, 374, 390])
+EYELID_LANDMARKS = np.array([159, 145])  # upper, lower
+
+# Edge zones for intrusion checks: 'rect' maps (frame width, frame height, edge width)
+# to (x0, y0, x1, y1) pixels - fixed EDGE_WIDTH strips at any resolution, as before.
+# 'side' skips the zone when the candidate's face is near that side;
+# 'confirm_hands' requires a hand in the zone before flagging; 'face_below' only
+# checks the zone when the face top is below that fraction of the frame height.
+EDGE_WIDTH = 80
+EDGE_ZONES = (
+    {'name': 'left_edge', 'rect': lambda w, h, e: (0, 0, e, h), 'side': 'left', 'face_below': None,
+     'confirm_hands': True, 'message': "Body part detected at left edge (another person)"},
+    {'name': 'right_edge', 'rect': lambda w, h, e: (w - e, 0, w, h), 'side': 'right', 'face_below': None,
+     'confirm_hands': True, 'message': "Body part detected at right edge (another person)"},
+    {'name': 'top_left', 'rect': lambda w, h, e: (0, 0, w // 3, e), 'side': None, 'face_below': 0.2,
+     'confirm_hands': False, 'message': "Body part detected at top edge (another person)"},
+    {'name': 'top_right', 'rect': lambda w, h, e: (2 * w // 3, 0, w, e), 'side': None, 'face_below': 0.2,
+     'confirm_hands': False, 'message': "Body part detected at top edge (another person)"},
+)
+SKIN_RATIO_THRESHOLD = 0.3
+
+LIVING_BEINGS = ('person', 'cat', 'dog', 'bird', 'horse', 'sheep', 'cow',
+                 'elephant', 'bear', 'zebra', 'giraffe')
+
+HEAD_POSE_MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0), (-30.0, -125.0, -30.0),
+    (30.0, -125.0, -30.0), (-60.0, -70.0, -60.0),
+    (60.0, -70.0, -60.0)
+])
+
 
 class RecordingSystem:
     """Handles interview recording with WebRTC compatibility"""
@@ -29,22 +87,83 @@ class RecordingSystem:
         self.baseline_environment = None
         self.violation_images_dir = tempfile.mkdtemp(prefix="violations_")
         
-        # Initialize pose detection if available - HEADLESS COMPATIBLE
+        # One capture handle per session, shared by setup and recording (see open_video_source)
+        self.video_source = None
+        # One audio stream per session (PCMRingBuffer): the app may attach one (browser microphone),
+        # otherwise open_audio_source captures the server microphone; answers are cut by timestamp
+        self.audio_buffer = None
+        self._microphone = None
+        self.noise_floor = None  # Room noise RMS, calibrated once during setup
+        # Speech recognition backend shared through the model set, else built on first use
+        self.asr = models_dict.get('asr')
+        
+        # PERFORMANCE: Evidence images are rendered and written off the capture thread
+        self.evidence_writer = EvidenceWriter(
+            self.violation_images_dir,
+            jpeg_quality=EVIDENCE_JPEG_QUALITY,
+            dedup_max_distance=EVIDENCE_DEDUP_MAX_DISTANCE,
+            dedup_window_seconds=EVIDENCE_DEDUP_WINDOW_SECONDS
+        )
+        # Last few seconds of downscaled frames, dumped as a clip beside each still
+        self.clip_buffer = ClipRingBuffer(EVIDENCE_CLIP_SECONDS, TARGET_FPS, EVIDENCE_CLIP_SIZE)
+        
+        # PERFORMANCE: Per-session counters (frame view reuse, etc.)
+        self.perf_stats = {}
+        
+        # PERFORMANCE: Run each compliance check at its own cadence within a frame budget
+        self.scheduler = DetectorScheduler({
+            'multiple_bodies': DETECTOR_CADENCE['pose'],
+            'person_outside': DETECTOR_CADENCE['yolo'],
+            'edge_intrusion': DETECTOR_CADENCE['hands'],
+            'hands_outside': DETECTOR_CADENCE['hands'],
+            'suspicious_movements': DETECTOR_CADENCE['hands'],
+            'new_objects': SAMPLE_EVERY_N_FRAMES
+        }, frame_budget_ms=DETECTOR_FRAME_BUDGET_MS)
+        
+        # PERFORMANCE: Skip YOLO/Hands/Pose on static frames, carrying verdicts forward
+        self.motion_gate = MotionGate(MOTION_THRESHOLD, MOTION_MAX_CARRY_FRAMES, stateful=('new_objects',))
+        
+        # Track IDs let new-object checks run once per object instead of every frame
+        self.object_tracker = ObjectTracker(max_missed=OBJECT_TRACK_MAX_MISSED,
+                                            min_hits=OBJECT_TRACK_MIN_HITS)
+        self._living_beings_mask = None  # Class-id mask, built from the YOLO class names on first use
+        
+        # Pooled model sets (see DetectorPool) bring their own Pose graph
+        if 'pose' in models_dict:
+            self.pose_detector = models_dict['pose']
+            self.pose_available = self.pose_detector is not None
+        else:
+            self.pose_detector, self.pose_available = self.create_pose_detector()
+    
+    @staticmethod
+    def create_pose_detector():
+        """Initialize pose detection if available - HEADLESS COMPATIBLE"""
         try:
             import mediapipe as mp
-            self.mp_pose = mp.solutions.pose
-            self.pose_detector = self.mp_pose.Pose(
+            pose_detector = mp.solutions.pose.Pose(
                 static_image_mode=False,
                 model_complexity=0,  # Use simplest model for headless
                 smooth_landmarks=False,  # Disable for performance
                 min_detection_confidence=0.5,
                 min_tracking_confidence=0.5
             )
-            self.pose_available = True
+            return pose_detector, True
         except Exception as e:
             print(f"⚠️ Pose detection disabled: {e}")
-            self.pose_detector = None
-            self.pose_available = False 
+            return None, False
+    
+    def frame_context(self, frame, ctx=None):
+        """Return the shared per-frame context, creating one if the caller has none"""
+        if ctx is not None:
+            return ctx
+        pose_detector = self.pose_detector if self.pose_available else None
+        return FrameContext(frame, self.models, pose_detector, stats=self.perf_stats)
+    
+    def run_detector(self, name, default, detector, *args):
+        """Run a compliance detector if scheduled this frame, reusing its verdict on static frames"""
+        if name not in self.scheduler.planned:
+            return default
+        return self.motion_gate.run(name, self.scheduler.run, name, default, detector, *args)
     # def __init__(self, models_dict):
     #     self.models = models_dict
     #     self.violation_detected = False
@@ -70,34 +189,13 @@ class RecordingSystem:
     #         self.pose_detector = None
     #         self.pose_available = False
     
-    def save_violation_image(self, frame, question_number, violation_reason):
-        """Save violation image with overlay"""
+    def save_violation_image(self, frame, question_number, violation_reason, timestamp=None):
+        """Queue violation image with overlay; returns the path it will be written to"""
         try:
-            timestamp = int(time.time() * 1000)
-            filename = f"violation_q{question_number}_{timestamp}.jpg"
-            filepath = os.path.join(self.violation_images_dir, filename)
-            
-            # Create overlay
-            overlay_frame = frame.copy()
-            h, w = overlay_frame.shape[:2]
-            
-            # Add semi-transparent red overlay
-            red_overlay = overlay_frame.copy()
-            cv2.rectangle(red_overlay, (0, 0), (w, h), (0, 0, 255), -1)
-            overlay_frame = cv2.addWeighted(overlay_frame, 0.7, red_overlay, 0.3, 0)
-            
-            # Add thick red border
-            cv2.rectangle(overlay_frame, (0, 0), (w-1, h-1), (0, 0, 255), 10)
-            
-            # Add violation text
-            text = "VIOLATION DETECTED"
-            cv2.rectangle(overlay_frame, (0, 0), (w, 80), (0, 0, 0), -1)
-            cv2.putText(overlay_frame, text, (w//2 - 200, 50),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
-            
-            # Save image
-            cv2.imwrite(filepath, overlay_frame)
-            return filepath
+            # Overlay, JPEG encode, clip encode and disk writes happen on the evidence thread;
+            # near-duplicates of the same violation return the earlier image's path
+            clip = self.clip_buffer.snapshot() if len(self.clip_buffer) else None
+            return self.evidence_writer.submit(frame, question_number, violation_reason, timestamp, clip=clip)
             
         except Exception as e:
             print(f"Error saving violation image: {e}")
@@ -207,10 +305,10 @@ class RecordingSystem:
         Scan and catalog the environment before test starts
         """
         if self.models['yolo'] is None:
-            return {'objects': [], 'positions': []}
+            return {'objects': [], 'positions': [], 'index': BaselineIndex()}
         
         try:
-            results = self.models['yolo'].predict(frame, conf=0.25, verbose=False)
+            detections = self.frame_context(frame).detections()
             
             environment_data = {
                 'objects': [],
@@ -218,14 +316,9 @@ class RecordingSystem:
                 'person_position': None
             }
             
-            if results and len(results) > 0:
-                names = self.models['yolo'].names
-                boxes = results[0].boxes
-                
-                for box in boxes:
-                    cls_id = int(box.cls[0])
-                    obj_name = names[cls_id]
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+            if len(detections):
+                for i, (x1, y1, x2, y2) in enumerate(detections.xyxy.tolist()):
+                    obj_name = detections.name(i)
                     
                     environment_data['objects'].append(obj_name)
                     environment_data['positions'].append({
@@ -237,79 +330,60 @@ class RecordingSystem:
                     if obj_name == 'person':
                         environment_data['person_position'] = (int((x1+x2)/2), int((y1+y2)/2))
             
+            # PERFORMANCE: Per-class spatial index for new-object lookups
+            environment_data['index'] = BaselineIndex.from_positions(environment_data['positions'])
             return environment_data
             
         except Exception as e:
-            return {'objects': [], 'positions': []}
+            return {'objects': [], 'positions': [], 'index': BaselineIndex()}
     
-    def detect_new_objects(self, frame):
+    def detect_new_objects(self, frame, ctx=None):
         """
         Detect NEW objects that weren't in baseline environment
         """
         if self.models['yolo'] is None or self.baseline_environment is None:
             return False, []
         
+        baseline_index = self.baseline_environment.get('index')
+        if baseline_index is None:
+            baseline_index = BaselineIndex.from_positions(self.baseline_environment.get('positions', []))
+            self.baseline_environment['index'] = baseline_index
+        
         try:
-            results = self.models['yolo'].predict(frame, conf=0.25, verbose=False)
+            detections = self.frame_context(frame, ctx).detections()
             
-            if results and len(results) > 0:
-                names = self.models['yolo'].names
-                boxes = results[0].boxes
-                
-                current_objects = []
-                for box in boxes:
-                    cls_id = int(box.cls[0])
-                    obj_name = names[cls_id]
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    current_center = (int((x1+x2)/2), int((y1+y2)/2))
-                    
-                    current_objects.append({
-                        'name': obj_name,
-                        'center': current_center,
-                        'bbox': (int(x1), int(y1), int(x2), int(y2))
-                    })
-                
-                baseline_objects = self.baseline_environment['positions']
-                new_items = []
+            # Only objects seen for the first time (new track IDs) are checked,
+            # so an object flickering in and out of detection is reported once.
+            # Empty frames update the tracker too, so tracks of objects that left age out.
+            new_items = []
+            for track_id, cls_id, bbox in self.object_tracker.update(detections.xyxy, detections.class_ids):
+                obj_name = detections.names[cls_id]
+                if obj_name == 'person':
+                    continue
                 
-                for curr_obj in current_objects:
-                    if curr_obj['name'] == 'person':
-                        continue
-                    
-                    is_baseline = False
-                    for base_obj in baseline_objects:
-                        if curr_obj['name'] == base_obj['name']:
-                            dist = np.sqrt(
-                                (curr_obj['center'][0] - base_obj['center'][0])**2 +
-                                (curr_obj['center'][1] - base_obj['center'][1])**2
-                            )
-                            if dist < 100:
-                                is_baseline = True
-                                break
-                    
-                    if not is_baseline:
-                        new_items.append(curr_obj['name'])
-                
-                if new_items:
-                    return True, list(set(new_items))
+                center = ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
+                if not baseline_index.contains(obj_name, center):
+                    new_items.append(obj_name)
+            
+            if new_items:
+                return True, list(set(new_items))
             
             return False, []
             
         except Exception as e:
             return False, []
     
-    def detect_suspicious_movements(self, frame):
+    def detect_suspicious_movements(self, frame, ctx=None):
         """Detect suspicious hand movements"""
         if self.models['hands'] is None:
             return False, ""
         
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         h, w = frame.shape[:2]
         
         try:
-            hand_results = self.models['hands'].process(rgb_frame)
+            hand_results = self.frame_context(frame, ctx).hands()
             
-            if hand_results.multi_hand_landmarks:
+            if hand_results and hand_results.multi_hand_landmarks:
                 for hand_landmarks in hand_results.multi_hand_landmarks:
                     wrist = hand_landmarks.landmark[0]
                     index_tip = hand_landmarks.landmark[8]
@@ -328,25 +402,27 @@ class RecordingSystem:
         
         return False, ""
     
-    def calculate_eye_gaze(self, face_landmarks, frame_shape):
-        """Calculate if eyes are looking at camera"""
+    def face_box_from_landmarks(self, face_landmarks, frame_shape):
+        """Bounding box (x, y, w, h) in pixels from a face landmark array"""
         h, w = frame_shape[:2]
+        landmarks = landmarks_to_array(face_landmarks)
         
-        left_eye_indices = [468, 469, 470, 471, 472]
-        right_eye_indices = [473, 474, 475, 476, 477]
-        left_eye_center = [33, 133, 157, 158, 159, 160, 161, 163, 144, 145, 153, 154, 155]
-        right_eye_center = [362, 263, 387, 386, 385, 384, 398, 382, 381, 380, 373, 374, 390]
-        
-        landmarks = face_landmarks.landmark
-        
-        left_iris_x = np.mean([landmarks[i].x for i in left_eye_indices if i < len(landmarks)])
-        left_eye_x = np.mean([landmarks[i].x for i in left_eye_center if i < len(landmarks)])
+        xy = landmarks[:, :2] * np.array([w, h], dtype=np.float32)
+        min_x, min_y = xy.min(axis=0)
+        max_x, max_y = xy.max(axis=0)
+        return (int(min_x), int(min_y), int(max_x - min_x), int(max_y - min_y))
+    
+    def calculate_eye_gaze(self, face_landmarks, frame_shape):
+        """Calculate if eyes are looking at camera"""
+        landmarks = landmarks_to_array(face_landmarks)
         
-        right_iris_x = np.mean([landmarks[i].x for i in right_eye_indices if i < len(landmarks)])
-        right_eye_x = np.mean([landmarks[i].x for i in right_eye_center if i < len(landmarks)])
+        # Iris landmarks only exist with refine_landmarks=True
+        if len(landmarks) <= RIGHT_IRIS_LANDMARKS.max():
+            return False
         
-        left_gaze_ratio = (left_iris_x - left_eye_x) if left_iris_x and left_eye_x else 0
-        right_gaze_ratio = (right_iris_x - right_eye_x) if right_iris_x and right_eye_x else 0
+        x = landmarks[:, 0]
+        left_gaze_ratio = x[LEFT_IRIS_LANDMARKS].mean() - x[LEFT_EYE_LANDMARKS].mean()
+        right_gaze_ratio = x[RIGHT_IRIS_LANDMARKS].mean() - x[RIGHT_EYE_LANDMARKS].mean()
         
         avg_gaze = (left_gaze_ratio + right_gaze_ratio) / 2
         
@@ -355,16 +431,10 @@ class RecordingSystem:
     def estimate_head_pose(self, face_landmarks, frame_shape):
         """Estimate head pose angles"""
         h, w = frame_shape[:2]
-        landmarks_3d = np.array([(lm.x * w, lm.y * h, lm.z) for lm in face_landmarks.landmark])
-        
-        required_indices = [1, 33, 263, 61, 291]
-        image_points = np.array([landmarks_3d[i] for i in required_indices], dtype="double")
+        landmarks = landmarks_to_array(face_landmarks)
         
-        model_points = np.array([
-            (0.0, 0.0, 0.0), (-30.0, -125.0, -30.0),
-            (30.0, -125.0, -30.0), (-60.0, -70.0, -60.0),
-            (60.0, -70.0, -60.0)
-        ])
+        image_points = landmarks[HEAD_POSE_LANDMARKS].astype("double") * np.array([w, h, 1.0])
+        model_points = HEAD_POSE_MODEL_POINTS
         
         focal_length = w
         center = (w / 2, h / 2)
@@ -391,14 +461,13 @@ class RecordingSystem:
     
     def detect_blink(self, face_landmarks):
         """Detect if eye is blinking"""
-        upper_lid = face_landmarks.landmark[159]
-        lower_lid = face_landmarks.landmark[145]
-        eye_openness = abs(upper_lid.y - lower_lid.y)
+        upper_y, lower_y = landmarks_to_array(face_landmarks)[EYELID_LANDMARKS, 1]
+        eye_openness = abs(upper_y - lower_y)
         return eye_openness < 0.01
     
-    def analyze_lighting(self, frame):
+    def analyze_lighting(self, frame, ctx=None):
         """Analyze lighting conditions"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = self.frame_context(frame, ctx).views.gray
         mean_brightness = np.mean(gray)
         std_brightness = np.std(gray)
         
@@ -437,56 +506,52 @@ class RecordingSystem:
         
         return True, "Within boundaries", "OK"
     
-    def detect_person_outside_frame(self, frame):
+    def detect_person_outside_frame(self, frame, ctx=None):
         """Detect if any person/living being is outside boundaries"""
         if self.models['yolo'] is None:
             return False, "", ""
         
         h, w = frame.shape[:2]
         margin = self.frame_margin
+        min_conf = 0.4
         
         try:
-            results = self.models['yolo'].predict(frame, conf=0.4, verbose=False)
+            # Shared YOLO pass runs at a lower confidence; filter to ours below
+            detections = self.frame_context(frame, ctx).detections()
             
-            if results and len(results) > 0:
-                names = self.models['yolo'].names
-                boxes = results[0].boxes
+            if len(detections):
+                if self._living_beings_mask is None:
+                    self._living_beings_mask = class_id_mask(detections.names, LIVING_BEINGS)
+                beings = detections.min_conf(min_conf).of_classes(self._living_beings_mask)
                 
-                living_beings = ['person', 'cat', 'dog', 'bird', 'horse', 'sheep', 'cow', 
-                                'elephant', 'bear', 'zebra', 'giraffe']
+                # Margin checks for all boxes at once; report the first offending box
+                x1, y1, x2, y2 = beings.xyxy.T
+                outside_left = (x1 < margin) | (x2 < margin)
+                outside_right = (x1 > (w - margin)) | (x2 > (w - margin))
+                outside_top = (y1 < margin) | (y2 < margin)
+                outside = outside_left | outside_right | outside_top
                 
-                for i, box in enumerate(boxes):
-                    cls_id = int(box.cls[0])
-                    obj_name = names[cls_id]
-                    
-                    if obj_name.lower() in living_beings:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        
-                        if x1 < margin or x2 < margin:
-                            return True, obj_name, "LEFT"
-                        
-                        if x1 > (w - margin) or x2 > (w - margin):
-                            return True, obj_name, "RIGHT"
-                        
-                        if y1 < margin or y2 < margin:
-                            return True, obj_name, "TOP"
+                if outside.any():
+                    i = int(np.argmax(outside))
+                    side = "LEFT" if outside_left[i] else "RIGHT" if outside_right[i] else "TOP"
+                    return True, beings.name(i), side
         
         except Exception as e:
             pass
         
         return False, "", ""
     
-    def detect_multiple_bodies(self, frame, num_faces):
+    def detect_multiple_bodies(self, frame, num_faces, ctx=None):
         """Detect multiple bodies using pose and hand detection"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        ctx = self.frame_context(frame, ctx)
         body_count = 0
         detected_parts = []
         
         if self.pose_available and self.pose_detector:
             try:
-                pose_results = self.pose_detector.process(rgb_frame)
+                pose_results = ctx.pose()
                 
-                if pose_results.pose_landmarks:
+                if pose_results and pose_results.pose_landmarks:
                     body_count += 1
                     detected_parts.append("body")
                     
@@ -505,9 +570,9 @@ class RecordingSystem:
         
         if self.models['hands'] is not None:
             try:
-                hand_results = self.models['hands'].process(rgb_frame)
+                hand_results = ctx.hands()
                 
-                if hand_results.multi_hand_landmarks:
+                if hand_results and hand_results.multi_hand_landmarks:
                     num_hands = len(hand_results.multi_hand_landmarks)
                     
                     if num_hands > 2:
@@ -535,18 +600,17 @@ class RecordingSystem:
         
         return False, "", max(num_faces, body_count)
     
-    def detect_hands_outside_main_person(self, frame, face_box):
+    def detect_hands_outside_main_person(self, frame, face_box, ctx=None):
         """Detect hands outside main person's area"""
         if self.models['hands'] is None or face_box is None:
             return False, ""
         
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         h, w = frame.shape[:2]
         
         try:
-            hand_results = self.models['hands'].process(rgb_frame)
+            hand_results = self.frame_context(frame, ctx).hands()
             
-            if hand_results.multi_hand_landmarks:
+            if hand_results and hand_results.multi_hand_landmarks:
                 x, y, fw, fh = face_box
                 
                 expected_left = max(0, x - fw)
@@ -567,67 +631,42 @@ class RecordingSystem:
         
         return False, ""
     
-    def has_skin_tone(self, region):
-        """Check if region contains skin-like colors"""
-        if region.size == 0:
-            return False
-        
-        hsv = cv2.cvtColor(region, cv2.COLOR_BGR2HSV)
-        
-        lower_skin1 = np.array([0, 20, 70], dtype=np.uint8)
-        upper_skin1 = np.array([20, 255, 255], dtype=np.uint8)
-        lower_skin2 = np.array([0, 20, 0], dtype=np.uint8)
-        upper_skin2 = np.array([20, 150, 255], dtype=np.uint8)
-        
-        mask1 = cv2.inRange(hsv, lower_skin1, upper_skin1)
-        mask2 = cv2.inRange(hsv, lower_skin2, upper_skin2)
-        mask = cv2.bitwise_or(mask1, mask2)
-        
-        skin_ratio = np.sum(mask > 0) / mask.size
-        return skin_ratio > 0.3
-    
-    def detect_intrusion_at_edges(self, frame, face_box):
+    def detect_intrusion_at_edges(self, frame, face_box, ctx=None):
         """Detect body parts intruding from frame edges"""
         if face_box is None:
             return False, ""
         
+        ctx = self.frame_context(frame, ctx)
         h, w = frame.shape[:2]
         x, y, fw, fh = face_box
         
-        edge_width = 80
-        
-        left_region = frame[:, :edge_width]
-        right_region = frame[:, w-edge_width:]
-        top_left = frame[:edge_width, :w//3]
-        top_right = frame[:edge_width, 2*w//3:]
+        # PERFORMANCE: One skin mask + integral image per frame; each zone is an O(1) lookup
+        skin = ctx.views.skin
         
         face_center_x = x + fw // 2
-        face_far_from_left = face_center_x > w * 0.3
-        face_far_from_right = face_center_x < w * 0.7
-        
-        if face_far_from_left and self.has_skin_tone(left_region):
-            if self.models['hands']:
-                rgb_region = cv2.cvtColor(left_region, cv2.COLOR_BGR2RGB)
-                try:
-                    result = self.models['hands'].process(rgb_region)
-                    if result.multi_hand_landmarks:
-                        return True, "Body part detected at left edge (another person)"
-                except:
-                    pass
-        
-        if face_far_from_right and self.has_skin_tone(right_region):
-            if self.models['hands']:
-                rgb_region = cv2.cvtColor(right_region, cv2.COLOR_BGR2RGB)
-                try:
-                    result = self.models['hands'].process(rgb_region)
-                    if result.multi_hand_landmarks:
-                        return True, "Body part detected at right edge (another person)"
-                except:
-                    pass
-        
-        if y > h * 0.2:
-            if self.has_skin_tone(top_left) or self.has_skin_tone(top_right):
-                return True, "Body part detected at top edge (another person)"
+        face_far_from = {'left': face_center_x > w * 0.3, 'right': face_center_x < w * 0.7}
+        
+        candidates = []
+        for zone in EDGE_ZONES:
+            if zone['side'] is not None and not face_far_from[zone['side']]:
+                continue
+            if zone['face_below'] is not None and y <= h * zone['face_below']:
+                continue
+            
+            rect = zone['rect'](w, h, EDGE_WIDTH)
+            if skin.ratio(*rect) > SKIN_RATIO_THRESHOLD:
+                candidates.append((zone, rect))
+        
+        # PERFORMANCE: All skin-positive zones that need a hand go through one mosaic inference
+        hand_regions = {zone['name']: rect for zone, rect in candidates if zone['confirm_hands']}
+        region_hands = ctx.hands_in_regions(hand_regions) if hand_regions and self.models['hands'] else {}
+        
+        for zone, rect in candidates:
+            if not zone['confirm_hands']:
+                return True, zone['message']
+            found = region_hands.get(zone['name'])
+            if found is not None and len(found):
+                return True, zone['message']
         
         return False, ""
     
@@ -664,22 +703,26 @@ class RecordingSystem:
         if self.position_adjusted:
             return True
         
-        cap = cv2.VideoCapture(0)
+        # Shared session handles: opened once, released by the caller at session end
+        cap = self.open_video_source()
         if not cap.isOpened():
             return False
+        self.open_audio_source()
         
-        start_time = time.time()
+        start_time = cap.now()
         position_ok_counter = 0
         required_stable_frames = 30
         
         ui_callbacks['countdown_update']("📸 ONE-TIME SETUP: Adjust your position within the GREEN frame")
         
-        while (time.time() - start_time) < timeout:
+        while (cap.now() - start_time) < timeout:
             ret, frame = cap.read()
             if not ret:
+                if cap.ended:
+                    break
                 continue
             
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            ctx = self.frame_context(frame)
             h, w = frame.shape[:2]
             
             frame_with_boundaries = self.draw_frame_boundaries(frame)
@@ -690,9 +733,9 @@ class RecordingSystem:
             status_color = (255, 165, 0)
             
             if self.models['face_mesh'] is not None:
-                face_results = self.models['face_mesh'].process(rgb_frame)
+                face_results = ctx.face_mesh()
                 
-                if face_results.multi_face_landmarks:
+                if face_results and face_results.multi_face_landmarks:
                     num_faces = len(face_results.multi_face_landmarks)
                     
                     if num_faces > 1:
@@ -701,18 +744,11 @@ class RecordingSystem:
                         position_ok_counter = 0
                     
                     elif num_faces == 1:
-                        face_landmarks = face_results.multi_face_landmarks[0]
-                        
-                        landmarks_2d = np.array([(lm.x * w, lm.y * h) for lm in face_landmarks.landmark])
-                        x_coords = landmarks_2d[:, 0]
-                        y_coords = landmarks_2d[:, 1]
-                        face_box = (int(np.min(x_coords)), int(np.min(y_coords)), 
-                                   int(np.max(x_coords) - np.min(x_coords)), 
-                                   int(np.max(y_coords) - np.min(y_coords)))
+                        face_box = self.face_box_from_landmarks(ctx.face_landmarks(0), frame.shape)
                         
                         within_bounds, boundary_msg, boundary_status = self.check_frame_boundaries(frame, face_box)
                         
-                        outside_detected, obj_type, location = self.detect_person_outside_frame(frame)
+                        outside_detected, obj_type, location = self.detect_person_outside_frame(frame, ctx)
                         
                         if outside_detected:
                             status_message = f"⚠️ {obj_type.upper()} detected outside frame ({location} side)!"
@@ -764,11 +800,12 @@ class RecordingSystem:
             
             ui_callbacks['video_update'](cv2.resize(frame_with_boundaries, (640, 480)))
             
-            elapsed = int(time.time() - start_time)
+            elapsed = int(cap.now() - start_time)
             ui_callbacks['timer_update'](f"⏱️ Setup time: {elapsed}s / {timeout}s")
             
             if is_ready:
-                ui_callbacks['countdown_update']("🔍 Scanning environment... Please stay still")
+                ui_callbacks['countdown_update']("🔍 Scanning environment... Please stay still and quiet")
+                scan_start = time.time()
                 time.sleep(1)
                 
                 baseline_frames = []
@@ -781,6 +818,9 @@ class RecordingSystem:
                 if baseline_frames:
                     self.baseline_environment = self.scan_environment(baseline_frames[len(baseline_frames)//2])
                 
+                # The quiet scan doubles as the session's one noise-floor calibration
+                self.calibrate_noise_floor(scan_start, time.time())
+                
                 success_frame = frame_with_boundaries.copy()
                 cv2.rectangle(success_frame, (0, 0), (w, h), (0, 255, 0), 10)
                 cv2.putText(success_frame, "SETUP COMPLETE!", 
@@ -790,17 +830,116 @@ class RecordingSystem:
                 ui_callbacks['video_update'](cv2.resize(success_frame, (640, 480)))
                 time.sleep(3)
                 
-                cap.release()
                 ui_callbacks['countdown_update']('')
                 self.position_adjusted = True
                 return True
             
             time.sleep(0.03)
         
-        cap.release()
         ui_callbacks['countdown_update']('⚠️ Setup timeout - Please try again')
         return False
     
+    def open_frame_store(self, num_questions, duration_per_question):
+        """Preallocate the on-disk frame store for a session (None for the in-memory backend)"""
+        if FRAME_STORE_BACKEND != "memmap":
+            return None
+        
+        # Sampled frames plus one latest frame per question, with headroom for jitter
+        per_question = int(duration_per_question * TARGET_FPS * 1.25) // EMOTION_SAMPLE_EVERY + 2
+        return MemmapFrameStore(
+            tempfile.mkdtemp(prefix="frames_"),
+            capacity=num_questions * per_question,
+            sample_every=EMOTION_SAMPLE_EVERY
+        )
+    
+    def open_video_source(self):
+        """
+        Open the session's VideoSource once; setup and recording share the handle.
+        The app may attach its own source (e.g. WebRTC) to self.video_source first.
+        """
+        if self.video_source is None:
+            if VIDEO_SOURCE == "file":
+                self.video_source = create_video_source("file", path=VIDEO_SOURCE_PATH)
+            elif VIDEO_SOURCE == "synthetic":
+                self.video_source = create_video_source("synthetic", fps=TARGET_FPS)
+            else:
+                self.video_source = create_video_source(
+                    "webcam", width=MAX_FRAME_WIDTH, height=MAX_FRAME_HEIGHT, fps=TARGET_FPS
+                )
+        return self.video_source.open()
+    
+    def close_video_source(self):
+        """Release the session's VideoSource (end of session)"""
+        if self.video_source is not None:
+            self.video_source.release()
+            self.video_source = None
+    
+    def open_audio_source(self):
+        """
+        Start the session's single audio stream (idempotent). An attached buffer is used as is;
+        otherwise the server microphone is opened once and read into a new buffer until close.
+        """
+        if self.audio_buffer is None:
+            self.audio_buffer = PCMRingBuffer(AUDIO_RING_SECONDS, AUDIO_SAMPLE_RATE)
+            self._microphone = MicrophoneStream(self.audio_buffer).start()
+        return self.audio_buffer
+    
+    def close_audio_source(self):
+        """Stop the server microphone stream, if this session opened one"""
+        if self._microphone is not None:
+            self._microphone.stop()
+            self._microphone = None
+    
+    def calibrate_noise_floor(self, start_time, end_time):
+        """Measure the room's noise level once per session from a quiet stretch of session audio"""
+        if self.audio_buffer is not None:
+            quiet = self.audio_buffer.segment_between(start_time, end_time)
+            if len(quiet):
+                self.noise_floor = noise_floor(quiet, self.audio_buffer.sample_rate)
+        return self.noise_floor
+    
+    def answer_audio(self, question_number, start_time, duration):
+        """Answer samples cut from the session audio, plus its WAV path if enabled"""
+        # The answer window runs its full length even if a violation ended the question early
+        time.sleep(max(0.0, start_time + duration - time.time()))
+        try:
+            # Copied: the result outlives the ring's window once later questions wrap it
+            audio = self.audio_buffer.segment_between(start_time, start_time + duration).copy()
+        except AudioOverwritten as e:
+            print(f"⚠️ Answer audio for question {question_number} lost: {e}")
+            audio = np.empty(0, dtype=np.int16)
+        audio_path = None
+        if SESSION_AUDIO_WAV:
+            audio_temp = tempfile.NamedTemporaryFile(delete=False, suffix=f"_q{question_number}.wav")
+            audio_path = audio_temp.name
+            audio_temp.close()
+            write_wav(audio, audio_path, self.audio_buffer.sample_rate)
+        return audio, audio_path
+    
+    def open_session_video(self):
+        """Open the background session video writer (segmented PyAV or single AVI)"""
+        if SESSION_VIDEO_FORMAT == "segmented" and AV_AVAILABLE:
+            try:
+                return SegmentedVideoWriter(
+                    tempfile.mkdtemp(prefix="session_video_"),
+                    codec=SESSION_VIDEO_CODEC, preset=SESSION_VIDEO_PRESET,
+                    container=SESSION_VIDEO_CONTAINER,
+                    keyframe_interval=SESSION_VIDEO_KEYFRAME_INTERVAL,
+                    fps=float(TARGET_FPS), frame_size=(640, 480),
+                    queue_size=VIDEO_WRITER_QUEUE_SIZE, drop_policy=VIDEO_WRITER_DROP_POLICY
+                )
+            except Exception as e:
+                print(f"⚠️ Segmented video unavailable, falling back to AVI: {e}")
+        
+        session_video_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".avi")
+        session_video_path = session_video_temp.name
+        session_video_temp.close()
+        
+        return AsyncVideoWriter(
+            session_video_path, "XVID", 15.0, (640, 480),
+            queue_size=VIDEO_WRITER_QUEUE_SIZE, drop_policy=VIDEO_WRITER_DROP_POLICY
+        )
+    
     def record_interview(self, question_data, duration, ui_callbacks):
         """
         DEPRECATED: Use record_continuous_interview() instead
@@ -811,7 +950,12 @@ class RecordingSystem:
         if isinstance(result, dict) and 'questions_results' in result:
             if result['questions_results']:
                 first_result = result['questions_results'][0]
-                first_result['video_path'] = result.get('session_video_path', '')
+                # Segmented sessions record a directory; video_path stays a playable file
+                segments = result.get('session_video_segments') or []
+                first_result['video_segments'] = segments
+                first_result['video_index_path'] = result.get('session_video_index')
+                video_path = result.get('session_video_path', '')
+                first_result['video_path'] = video_path if os.path.isfile(video_path) else (segments[0] if segments else '')
                 first_result['violation_detected'] = len(first_result.get('violations', [])) > 0
                 first_result['violation_reason'] = first_result['violations'][0]['reason'] if first_result.get('violations') else ''
                 return first_result
@@ -831,20 +975,184 @@ class RecordingSystem:
         except:
             return None
     
-    def transcribe_audio(self, path):
-        """Transcribe audio file to text"""
-        r = sr.Recognizer()
+    def asr_backend(self):
+        """Speech recognition backend (ASR_BACKEND), loaded on first use if the model set has none"""
+        if self.asr is None:
+            self.asr = create_asr_backend(ASR_BACKEND, ASR_MODEL, AUDIO_SAMPLE_RATE)
+        return self.asr
+    
+    @staticmethod
+    def transcript_text(decode):
+        """Run a decode callable; empty results and errors become the usual placeholders"""
         try:
-            with sr.AudioFile(path) as source:
-                audio = r.record(source)
-            text = r.recognize_google(audio)
-            return text if text.strip() else "[Could not understand audio]"
-        except sr.UnknownValueError:
-            return "[Could not understand audio]"
-        except sr.RequestError:
+            text = decode()
+        except ASRUnavailable:
             return "[Speech recognition service unavailable]"
-        except:
+        except ASRTimeout:
+            return "[Transcription timed out]"
+        except Exception:
             return "[Could not understand audio]"
+        return text if text and text.strip() else "[Could not understand audio]"
+    
+    def transcribe_audio(self, audio):
+        """Transcribe a WAV file, or a 16 kHz int16 PCM array (session audio segment), to text"""
+        def decode():
+            samples = audio
+            if not isinstance(samples, np.ndarray):
+                with sr.AudioFile(audio) as source:
+                    audio_data = sr.Recognizer().record(source)
+                samples = np.frombuffer(
+                    audio_data.get_raw_data(convert_rate=AUDIO_SAMPLE_RATE, convert_width=2), dtype=np.int16
+                )
+            return self.asr_backend().transcribe(samples)
+        return self.transcript_text(decode)
+    
+    def new_question_state(self):
+        """Per-question counters and timers updated by check_frame"""
+        return {
+            'eye_contact_frames': 0,
+            'total_frames': 0,
+            'blink_count': 0,
+            'prev_blink': False,
+            'face_box': None,
+            'no_face_start': None,
+            'look_away_start': None,
+            'lighting_status': "Unknown",
+            'attention_status': "No Face"
+        }
+    
+    def check_frame(self, frame, state, now):
+        """
+        Run all per-frame compliance and attention checks on one frame.
+        state comes from new_question_state() and is updated in place;
+        now is the frame's time in seconds (drives the 2-second look-away/no-face rules).
+        Returns the violation message, or None.
+        """
+        # One shared context per frame: each model runs at most once
+        ctx = self.frame_context(frame)
+        self.scheduler.begin_frame()
+        self.motion_gate.begin_frame(ctx)
+        state['total_frames'] += 1
+        
+        state['lighting_status'], brightness = self.analyze_lighting(frame, ctx)
+        
+        num_faces = 0
+        looking_at_camera = False
+        state['attention_status'] = "No Face"
+        
+        # ========== FACE DETECTION & VIOLATION CHECKS ==========
+        if self.models['face_mesh'] is not None:
+            face_results = ctx.face_mesh()
+            
+            if face_results and face_results.multi_face_landmarks:
+                num_faces = len(face_results.multi_face_landmarks)
+                
+                # Check multiple bodies
+                is_multi_body, multi_msg, body_count = self.run_detector(
+                    'multiple_bodies', (False, "", num_faces),
+                    self.detect_multiple_bodies, frame, num_faces, ctx
+                )
+                
+                if is_multi_body:
+                    return multi_msg
+                
+                if num_faces > 1:
+                    return f"Multiple persons detected ({num_faces} faces)"
+                
+                elif num_faces == 1:
+                    state['no_face_start'] = None
+                    # PERFORMANCE: Landmarks converted once, shared by box/pose/gaze/blink
+                    face_landmarks = ctx.face_landmarks(0)
+                    
+                    try:
+                        state['face_box'] = self.face_box_from_landmarks(face_landmarks, frame.shape)
+                        
+                        # Check boundaries
+                        within_bounds, boundary_msg, boundary_status = self.check_frame_boundaries(frame, state['face_box'])
+                        
+                        if not within_bounds:
+                            return boundary_msg
+                        
+                        # Check person outside frame
+                        outside_detected, obj_type, location = self.run_detector(
+                            'person_outside', (False, "", ""),
+                            self.detect_person_outside_frame, frame, ctx
+                        )
+                        
+                        if outside_detected:
+                            return f"{obj_type.upper()} detected outside frame ({location} side)"
+                        
+                        # Check intrusions
+                        is_intrusion, intrusion_msg = self.run_detector(
+                            'edge_intrusion', (False, ""),
+                            self.detect_intrusion_at_edges, frame, state['face_box'], ctx
+                        )
+                        if is_intrusion:
+                            return intrusion_msg
+                        
+                        # Check hands outside
+                        is_hand_violation, hand_msg = self.run_detector(
+                            'hands_outside', (False, ""),
+                            self.detect_hands_outside_main_person, frame, state['face_box'], ctx
+                        )
+                        if is_hand_violation:
+                            return hand_msg
+                        
+                        # Suspicious movements
+                        is_suspicious, sus_msg = self.run_detector(
+                            'suspicious_movements', (False, ""),
+                            self.detect_suspicious_movements, frame, ctx
+                        )
+                        if is_suspicious:
+                            return sus_msg
+                        
+                        yaw, pitch, roll = self.estimate_head_pose(face_landmarks, frame.shape)
+                        gaze_centered = self.calculate_eye_gaze(face_landmarks, frame.shape)
+                        
+                        is_blink = self.detect_blink(face_landmarks)
+                        if is_blink and not state['prev_blink']:
+                            state['blink_count'] += 1
+                        state['prev_blink'] = is_blink
+                        
+                        head_looking_forward = abs(yaw) <= 20 and abs(pitch) <= 20
+                        
+                        if head_looking_forward and gaze_centered:
+                            state['look_away_start'] = None
+                            looking_at_camera = True
+                            state['eye_contact_frames'] += 1
+                            state['attention_status'] = "Looking at Camera ✓"
+                        else:
+                            if state['look_away_start'] is None:
+                                state['look_away_start'] = now
+                                state['attention_status'] = "Looking Away"
+                            else:
+                                elapsed = now - state['look_away_start']
+                                if elapsed > 2.0:
+                                    return "Looking away for >2 seconds"
+                                else:
+                                    state['attention_status'] = f"Looking Away ({elapsed:.1f}s)"
+                    except:
+                        state['attention_status'] = "Face Error"
+            else:
+                if state['no_face_start'] is None:
+                    state['no_face_start'] = now
+                    state['attention_status'] = "No Face Visible"
+                else:
+                    elapsed = now - state['no_face_start']
+                    if elapsed > 2.0:
+                        return "No face visible for >2 seconds"
+                    else:
+                        state['attention_status'] = f"No Face ({elapsed:.1f}s)"
+        
+        # Check for new objects
+        new_detected, new_items = self.run_detector(
+            'new_objects', (False, []), self.detect_new_objects, frame, ctx
+        )
+        if new_detected:
+            return f"New item(s) brought into view: {', '.join(new_items)}"
+        
+        
+        return None
     
     def record_continuous_interview(self, questions_list, duration_per_question, ui_callbacks):
         """
@@ -852,11 +1160,20 @@ class RecordingSystem:
         Captures violation images and stores them for display in results
         """
         
+        # One capture handle and one audio stream for the whole session (setup + all questions)
+        cap = self.open_video_source()
+        if not cap.isOpened():
+            self.close_video_source()
+            return {"error": "Unable to access camera"}
+        self.open_audio_source()
+        
         # ========== PRE-TEST SETUP ==========
         ui_callbacks['status_update']("**🔧 Initializing test environment...**")
         setup_success = self.pre_test_setup_phase(ui_callbacks, timeout=90)
         
         if not setup_success:
+            self.close_video_source()
+            self.close_audio_source()
             return {"error": "Setup phase failed or timeout"}
         
         # ========== INSTRUCTIONS ==========
@@ -881,19 +1198,26 @@ class RecordingSystem:
             time.sleep(1)
         ui_callbacks['countdown_update']('')
         
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            return {"error": "Unable to access camera"}
+        # PERFORMANCE: Encoding runs on a background writer thread
+        out = self.open_session_video()
+        session_video_path = out.output_dir if isinstance(out, SegmentedVideoWriter) else out.path
         
-        session_video_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".avi")
-        session_video_path = session_video_temp.name
-        session_video_temp.close()
+        # PERFORMANCE: Capture, encoding and UI publishing run on their own threads;
+        # this loop only does inference on the latest captured frame
+        pipeline = FramePipeline(cap, out, ui_callbacks, clip_buffer=self.clip_buffer).start()
         
-        fourcc = cv2.VideoWriter_fourcc(*"XVID")
-        out = cv2.VideoWriter(session_video_path, fourcc, 15.0, (640, 480))
+        # MEMORY: Optional on-disk store keeps resident memory flat for long sessions
+        frame_store = self.open_frame_store(len(questions_list), duration_per_question)
         
-        session_start_time = time.time()
+        # Session/question timing follows the source clock (capture timestamps)
+        session_start_time = cap.now()
         session_violations = []
+        self.perf_stats.clear()
+        self.evidence_writer.reset()
+        self.scheduler.reset()
+        self.motion_gate.reset()
+        self.object_tracker.reset()
+        frame_interval = 1.0 / TARGET_FPS
         
         # ========== LOOP THROUGH ALL QUESTIONS ==========
         for q_idx, question_data in enumerate(questions_list):
@@ -915,213 +1239,52 @@ class RecordingSystem:
                 ui_callbacks['timer_update'](f"⏱️ Starting in {i}s...")
                 time.sleep(1)
             
-            audio_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-            audio_path = audio_temp.name
-            audio_temp.close()
-            
-            audio_thread = threading.Thread(
-                target=lambda path=audio_path: self.record_audio_to_file(duration_per_question, path),
-                daemon=True
-            )
-            audio_thread.start()
-            
             # Question recording state
-            question_start_time = time.time()
-            frames = []
+            out.label_segment(q_idx + 1, question_data.get('question', ''))
+            pipeline.set_recording(q_idx + 1)
+            question_start_time = cap.now()
+            answer_start_time = time.time()  # Session audio runs on the wall clock
+            # PERFORMANCE: Offline backends decode the answer while it is being spoken
+            transcriber = StreamingTranscriber(
+                self.asr_backend(), self.audio_buffer, answer_start_time, duration_per_question,
+                chunk_seconds=ASR_CHUNK_SECONDS
+            ).start()
+            # MEMORY: Keep only the frames analysis reads (every Nth + latest)
+            if frame_store is not None:
+                frames = frame_store.question(q_idx + 1)
+            else:
+                frames = RetainedFrames(EMOTION_SAMPLE_EVERY, FRAME_RETENTION_JPEG_QUALITY)
             question_violations = []  # Store violations for THIS question
-            
-            no_face_start = None
-            look_away_start = None
-            
-            eye_contact_frames = 0
-            total_frames = 0
-            blink_count = 0
-            prev_blink = False
-            
-            face_box = None
+            state = self.new_question_state()
+            self.motion_gate.forget()  # No verdict carries across questions
             
             # ========== RECORDING LOOP FOR THIS QUESTION ==========
-            while (time.time() - question_start_time) < duration_per_question:
-                ret, frame = cap.read()
-                if not ret:
+            while (cap.now() - question_start_time) < duration_per_question:
+                captured = pipeline.next_frame(timeout=2.0)
+                if captured is None:
                     break
                 
-                out.write(frame)
-                frames.append(frame.copy())
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                frame_start = time.time()
+                _, capture_ts, frame = captured
+                frames.offer(frame, capture_ts)
                 h, w, _ = frame.shape
-                total_frames += 1
-                
-                lighting_status, brightness = self.analyze_lighting(frame)
-                
-                num_faces = 0
-                looking_at_camera = False
-                attention_status = "No Face"
                 
-                # ========== FACE DETECTION & VIOLATION CHECKS ==========
-                if self.models['face_mesh'] is not None:
-                    face_results = self.models['face_mesh'].process(rgb_frame)
-                    
-                    if face_results.multi_face_landmarks:
-                        num_faces = len(face_results.multi_face_landmarks)
-                        
-                        # Check multiple bodies
-                        is_multi_body, multi_msg, body_count = self.detect_multiple_bodies(frame, num_faces)
-                        
-                        if is_multi_body:
-                            violation_img_path = self.save_violation_image(frame, q_idx + 1, multi_msg)
-                            question_violations.append({
-                                'reason': multi_msg,
-                                'timestamp': time.time() - question_start_time,
-                                'image_path': violation_img_path
-                            })
-                            # Continue to next question instead of breaking
-                            break
-                        
-                        if num_faces > 1:
-                            violation_msg = f"Multiple persons detected ({num_faces} faces)"
-                            violation_img_path = self.save_violation_image(frame, q_idx + 1, violation_msg)
-                            question_violations.append({
-                                'reason': violation_msg,
-                                'timestamp': time.time() - question_start_time,
-                                'image_path': violation_img_path
-                            })
-                            break
-                        
-                        elif num_faces == 1:
-                            no_face_start = None
-                            face_landmarks = face_results.multi_face_landmarks[0]
-                            
-                            try:
-                                landmarks_2d = np.array([(lm.x * w, lm.y * h) for lm in face_landmarks.landmark])
-                                x_coords = landmarks_2d[:, 0]
-                                y_coords = landmarks_2d[:, 1]
-                                face_box = (int(np.min(x_coords)), int(np.min(y_coords)), 
-                                           int(np.max(x_coords) - np.min(x_coords)), 
-                                           int(np.max(y_coords) - np.min(y_coords)))
-                                
-                                # Check boundaries
-                                within_bounds, boundary_msg, boundary_status = self.check_frame_boundaries(frame, face_box)
-                                
-                                if not within_bounds:
-                                    violation_img_path = self.save_violation_image(frame, q_idx + 1, boundary_msg)
-                                    question_violations.append({
-                                        'reason': boundary_msg,
-                                        'timestamp': time.time() - question_start_time,
-                                        'image_path': violation_img_path
-                                    })
-                                    break
-                                
-                                # Check person outside frame
-                                outside_detected, obj_type, location = self.detect_person_outside_frame(frame)
-                                
-                                if outside_detected:
-                                    violation_msg = f"{obj_type.upper()} detected outside frame ({location} side)"
-                                    violation_img_path = self.save_violation_image(frame, q_idx + 1, violation_msg)
-                                    question_violations.append({
-                                        'reason': violation_msg,
-                                        'timestamp': time.time() - question_start_time,
-                                        'image_path': violation_img_path
-                                    })
-                                    break
-                                
-                                # Check intrusions
-                                is_intrusion, intrusion_msg = self.detect_intrusion_at_edges(frame, face_box)
-                                if is_intrusion:
-                                    violation_img_path = self.save_violation_image(frame, q_idx + 1, intrusion_msg)
-                                    question_violations.append({
-                                        'reason': intrusion_msg,
-                                        'timestamp': time.time() - question_start_time,
-                                        'image_path': violation_img_path
-                                    })
-                                    break
-                                
-                                # Check hands outside
-                                is_hand_violation, hand_msg = self.detect_hands_outside_main_person(frame, face_box)
-                                if is_hand_violation:
-                                    violation_img_path = self.save_violation_image(frame, q_idx + 1, hand_msg)
-                                    question_violations.append({
-                                        'reason': hand_msg,
-                                        'timestamp': time.time() - question_start_time,
-                                        'image_path': violation_img_path
-                                    })
-                                    break
-                                
-                                # Suspicious movements
-                                is_suspicious, sus_msg = self.detect_suspicious_movements(frame)
-                                if is_suspicious:
-                                    violation_img_path = self.save_violation_image(frame, q_idx + 1, sus_msg)
-                                    question_violations.append({
-                                        'reason': sus_msg,
-                                        'timestamp': time.time() - question_start_time,
-                                        'image_path': violation_img_path
-                                    })
-                                    break
-                                
-                                yaw, pitch, roll = self.estimate_head_pose(face_landmarks, frame.shape)
-                                gaze_centered = self.calculate_eye_gaze(face_landmarks, frame.shape)
-                                
-                                is_blink = self.detect_blink(face_landmarks)
-                                if is_blink and not prev_blink:
-                                    blink_count += 1
-                                prev_blink = is_blink
-                                
-                                head_looking_forward = abs(yaw) <= 20 and abs(pitch) <= 20
-                                
-                                if head_looking_forward and gaze_centered:
-                                    look_away_start = None
-                                    looking_at_camera = True
-                                    eye_contact_frames += 1
-                                    attention_status = "Looking at Camera ✓"
-                                else:
-                                    if look_away_start is None:
-                                        look_away_start = time.time()
-                                        attention_status = "Looking Away"
-                                    else:
-                                        elapsed = time.time() - look_away_start
-                                        if elapsed > 2.0:
-                                            violation_msg = "Looking away for >2 seconds"
-                                            violation_img_path = self.save_violation_image(frame, q_idx + 1, violation_msg)
-                                            question_violations.append({
-                                                'reason': violation_msg,
-                                                'timestamp': time.time() - question_start_time,
-                                                'image_path': violation_img_path
-                                            })
-                                            break
-                                        else:
-                                            attention_status = f"Looking Away ({elapsed:.1f}s)"
-                            except:
-                                attention_status = "Face Error"
-                    else:
-                        if no_face_start is None:
-                            no_face_start = time.time()
-                            attention_status = "No Face Visible"
-                        else:
-                            elapsed = time.time() - no_face_start
-                            if elapsed > 2.0:
-                                violation_msg = "No face visible for >2 seconds"
-                                violation_img_path = self.save_violation_image(frame, q_idx + 1, violation_msg)
-                                question_violations.append({
-                                    'reason': violation_msg,
-                                    'timestamp': time.time() - question_start_time,
-                                    'image_path': violation_img_path
-                                })
-                                break
-                            else:
-                                attention_status = f"No Face ({elapsed:.1f}s)"
+                violation_msg = self.check_frame(frame, state, capture_ts)
+                if violation_msg:
+                    violation_img_path = self.save_violation_image(frame, q_idx + 1, violation_msg, capture_ts)
+                    question_violations.append({
+                        'reason': violation_msg,
+                        'timestamp': capture_ts - question_start_time,
+                        'image_path': violation_img_path
+                    })
+                    # Continue to next question instead of breaking
+                    break
                 
-                # Check for new objects
-                if total_frames % 20 == 0:
-                    new_detected, new_items = self.detect_new_objects(frame)
-                    if new_detected:
-                        violation_msg = f"New item(s) brought into view: {', '.join(new_items)}"
-                        violation_img_path = self.save_violation_image(frame, q_idx + 1, violation_msg)
-                        question_violations.append({
-                            'reason': violation_msg,
-                            'timestamp': time.time() - question_start_time,
-                            'image_path': violation_img_path
-                        })
-                        break
+                lighting_status = state['lighting_status']
+                attention_status = state['attention_status']
+                eye_contact_frames = state['eye_contact_frames']
+                total_frames = state['total_frames']
+                blink_count = state['blink_count']
                 
                 # Display frame
                 overlay = frame.copy()
@@ -1139,12 +1302,12 @@ class RecordingSystem:
                 cv2.putText(frame_display, f"Eye Contact: {int((eye_contact_frames/max(total_frames,1))*100)}%", (10, 90),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
                 
-                elapsed_q = time.time() - question_start_time
+                elapsed_q = capture_ts - question_start_time
                 remaining = max(0, int(duration_per_question - elapsed_q))
                 cv2.putText(frame_display, f"Time: {remaining}s", (10, 115),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
                 
-                ui_callbacks['video_update'](cv2.resize(frame_display, (480, 360)))
+                ui_updates = [('video_update', (cv2.resize(frame_display, (480, 360)),))]
                 
                 eye_contact_pct = (eye_contact_frames / max(total_frames, 1)) * 100
                 status_text = f"""
@@ -1159,22 +1322,37 @@ class RecordingSystem:
                 if question_violations:
                     status_text += f"\n\n⚠️ **Violations in this question:** {len(question_violations)}"
                 
-                ui_callbacks['status_update'](status_text)
+                ui_updates.append(('status_update', (status_text,)))
                 
                 overall_progress = (q_idx + (elapsed_q / duration_per_question)) / len(questions_list)
                 overall_progress = max(0.0, min(1.0, overall_progress))
-                ui_callbacks['progress_update'](overall_progress)
-                ui_callbacks['timer_update'](f"🎥 Q{q_idx+1}/{len(questions_list)} - {remaining}s remaining")
+                ui_updates.append(('progress_update', (overall_progress,)))
+                ui_updates.append(('timer_update', (f"🎥 Q{q_idx+1}/{len(questions_list)} - {remaining}s remaining",)))
                 
-                time.sleep(0.05)
+                pipeline.publish(ui_updates)
+                pipeline.record_inference_time(time.time() - frame_start)
+                
+                # Throttle to the target frame rate instead of a fixed sleep
+                time.sleep(max(0.0, frame_interval - (time.time() - frame_start)))
+            
+            # Stop encoding between questions and let pending UI updates land first
+            pipeline.set_recording(None)
+            frames.finalize()
+            pipeline.flush_ui()
+            
+            for v in question_violations:
+                v['clip_path'] = self.evidence_writer.clip_path_for(v['image_path'])
             
-            # Wait for audio
-            audio_thread.join(timeout=duration_per_question + 5)
+            if isinstance(out, SegmentedVideoWriter):
+                for v in question_violations:
+                    out.mark_violation(q_idx + 1, question_start_time + v['timestamp'], v['reason'])
             
-            # Transcribe
-            transcript = ""
-            if os.path.exists(audio_path):
-                transcript = self.transcribe_audio(audio_path)
+            # Cut this answer out of the session audio stream
+            audio, audio_path = self.answer_audio(q_idx + 1, answer_start_time, duration_per_question)
+            
+            # Transcript: streaming backends are (nearly) done by now
+            transcript = self.transcript_text(lambda: transcriber.result(timeout=ASR_RESULT_TIMEOUT))
+            answer_end_time = answer_start_time + duration_per_question
             
             # Add violations to session list
             if question_violations:
@@ -1185,18 +1363,31 @@ class RecordingSystem:
                 'question_number': q_idx + 1,
                 'question_text': question_data.get('question', ''),
                 'audio_path': audio_path,
+                'audio': audio,  # Copied out of the session audio buffer
+                'noise_floor': self.noise_floor,
+                'asr': {
+                    'backend': self.asr.name,
+                    'fallback_reason': self.asr.fallback_reason,
+                    'timed_out': transcriber.timed_out,
+                    'ready_after_s': round(max(0.0, (transcriber.finished_at or time.time()) - answer_end_time), 2)
+                },
                 'frames': frames,
+                'frame_store_path': frame_store.directory if frame_store is not None else None,
                 'violations': question_violations,  # Now includes image paths
                 'violation_detected': len(question_violations) > 0,
-                'eye_contact_pct': (eye_contact_frames / max(total_frames, 1)) * 100,
-                'blink_count': blink_count,
-                'face_box': face_box,
+                'eye_contact_pct': (state['eye_contact_frames'] / max(state['total_frames'], 1)) * 100,
+                'blink_count': state['blink_count'],
+                'face_box': state['face_box'],
                 'transcript': transcript,
-                'lighting_status': lighting_status
+                'lighting_status': state['lighting_status']
             }
             
             all_results.append(question_result)
             
+            # Optional hook: hand the finished question over (e.g. for analysis) while recording continues
+            if 'question_complete' in ui_callbacks:
+                ui_callbacks['question_complete'](question_result)
+            
             # Show message and continue to next question
             if question_violations:
                 ui_callbacks['countdown_update'](f"⚠️ Violation detected in Q{q_idx + 1}! Continuing to next question in 3s...")
@@ -1205,9 +1396,16 @@ class RecordingSystem:
                 ui_callbacks['countdown_update'](f"✅ Question {q_idx + 1} complete! Next question in 3s...")
                 time.sleep(3)
         
-        # Cleanup
-        cap.release()
+        # Cleanup: stop capture, then flush queued frames and close the video
+        session_duration = cap.now() - session_start_time
+        pipeline.stop()
+        self.close_video_source()
+        self.close_audio_source()
         out.release()
+        if frame_store is not None:
+            frame_store.flush()
+        # Make sure all evidence images are on disk before results are shown
+        self.evidence_writer.close()
         
         # Clear UI
         ui_callbacks['video_update'](None)
@@ -1229,12 +1427,19 @@ class RecordingSystem:
         return {
             'questions_results': all_results,
             'session_video_path': session_video_path,
+            'session_video_index': out.index_path,
+            'session_video_segments': [s['path'] for s in out.segments] if isinstance(out, SegmentedVideoWriter) else [],
             'total_questions': len(questions_list),
             'completed_questions': len(all_results),
             'session_violations': session_violations,
             'total_violations': total_violations,
             'violation_images_dir': self.violation_images_dir,
-            'session_duration': time.time() - session_start_time
+            'session_duration': session_duration,
+            'perf_stats': dict(self.perf_stats),
+            'detector_schedule': self.scheduler.stats(),
+            'motion_gate': self.motion_gate.stats(),
+            'pipeline_metrics': pipeline.metrics(),
+            'evidence_metrics': self.evidence_writer.metrics()
         }
 
 ####
\ No newline at end of file
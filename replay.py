@@ -0,0 +1,241 @@
+"""
+Offline replay - PERFORMANCE OPTIMIZED
+Runs the RecordingSystem compliance pipeline over a recorded session (a session
+AVI with its .index.json sidecar, or a segmented session directory) without the
+camera or real-time pacing. Questions are processed in parallel, one detector set
+per worker process, and merged into the usual questions_results structure.
+
+    python replay.py session.avi --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import EMOTION_SAMPLE_EVERY, FRAME_RETENTION_JPEG_QUALITY
+from frame_store import RetainedFrames
+from video_source import FileSource
+
+_worker_system = None  # RecordingSystem owned by this worker process
+
+
+def _init_worker(output_dir):
+    """Process-pool initializer: load one detector set per worker"""
+    global _worker_system
+    from detector_pool import load_detector_set
+    from recording_system import RecordingSystem
+
+    system = RecordingSystem(load_detector_set())
+    # Offline there is no real-time budget: every check runs at its cadence
+    system.scheduler.frame_budget_ms = float('inf')
+    # Evidence goes to the caller's directory; drop the (empty) one RecordingSystem made
+    shutil.rmtree(system.violation_images_dir, ignore_errors=True)
+    system.violation_images_dir = output_dir
+    system.evidence_writer.output_dir = output_dir
+    _worker_system = system
+
+
+def session_index_path(video_path):
+    """Index written with a recorded session: index.json in a segment directory, or the AVI's sidecar"""
+    if os.path.isdir(video_path):
+        return os.path.join(video_path, "index.json")
+    return os.path.splitext(video_path)[0] + ".index.json"
+
+
+def plan_segments(video_path):
+    """
+    One job per recorded question, from the session's index: a segment file each,
+    or the [start_frame, end_frame) range the question occupies in the session AVI.
+    Answers end early on a violation, so question boundaries are never guessed.
+    """
+    index_path = session_index_path(video_path)
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(
+            f"No session index for {video_path} (expected {index_path}); "
+            "replay needs the question boundaries recorded with the session"
+        )
+    with open(index_path) as f:
+        index = json.load(f)
+
+    jobs = []
+    for seg in index['segments']:
+        job = {'question_number': seg['question_number'], 'question_text': seg.get('question_text', '')}
+        if 'path' in seg:
+            job.update(path=seg['path'], start_frame=0, end_frame=None)
+        else:
+            job.update(path=video_path, start_frame=seg['start_frame'], end_frame=seg['end_frame'])
+        jobs.append(job)
+    return jobs
+
+
+def _scan_baseline(system, baseline_path):
+    """Pre-test environment scan on the first frame of the session"""
+    source = FileSource(baseline_path, realtime=False).open()
+    ret, frame = source.read()
+    source.release()
+    if ret:
+        system.baseline_environment = system.scan_environment(frame)
+
+
+def replay_segment(job, baseline_path, stop_on_violation=True):
+    """Run the per-frame checks over one segment; returns a question result"""
+    system = _worker_system
+    system.perf_stats.clear()
+    system.evidence_writer.reset()
+    system.scheduler.reset()
+    system.motion_gate.reset()
+    system.object_tracker.reset()
+    system.clip_buffer.clear()
+    _scan_baseline(system, baseline_path)
+
+    # Media timestamps replace wall-clock time, so timers behave as they did live
+    source = FileSource(job['path'], job['start_frame'], job['end_frame'], realtime=False).open()
+    segment_start = job['start_frame'] / source.fps if source.isOpened() else 0.0
+
+    q_num = job['question_number']
+    frames = RetainedFrames(EMOTION_SAMPLE_EVERY, FRAME_RETENTION_JPEG_QUALITY)
+    state = system.new_question_state()
+    violations = []
+    start = time.perf_counter()
+
+    while True:
+        ret, frame, video_ts = source.read_frame()
+        if not ret:
+            break
+
+        frames.offer(frame, video_ts)
+        system.clip_buffer.push(frame, video_ts)
+        violation_msg = system.check_frame(frame, state, video_ts)
+        if violation_msg:
+            image_path = system.save_violation_image(frame, q_num, violation_msg, video_ts)
+            violations.append({
+                'reason': violation_msg,
+                'timestamp': video_ts - segment_start,
+                'image_path': image_path
+            })
+            if stop_on_violation:
+                break  # Same as live recording: a violation ends the question
+
+    source.release()
+    frames.finalize()
+    system.evidence_writer.flush()
+    for v in violations:
+        v['clip_path'] = system.evidence_writer.clip_path_for(v['image_path'])
+
+    processed = source.frames_read
+    elapsed = time.perf_counter() - start
+    return {
+        'question_number': q_num,
+        'question_text': job['question_text'],
+        'audio_path': None,
+        'audio': None,
+        'frames': frames,
+        'frame_store_path': None,
+        'violations': violations,
+        'violation_detected': len(violations) > 0,
+        'eye_contact_pct': (state['eye_contact_frames'] / max(state['total_frames'], 1)) * 100,
+        'blink_count': state['blink_count'],
+        'face_box': state['face_box'],
+        'transcript': "",
+        'lighting_status': state['lighting_status'],
+        'replay': {
+            'frames_processed': processed,
+            'processing_seconds': round(elapsed, 3),
+            'fps': round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+            'worker_pid': os.getpid(),
+            'detector_schedule': system.scheduler.stats(),
+            'motion_gate': system.motion_gate.stats()
+        }
+    }
+
+
+def replay_session(video_path, workers=None, output_dir=None, stop_on_violation=True):
+    """
+    Re-audit a recorded session; returns the same structure as
+    RecordingSystem.record_continuous_interview plus throughput metrics.
+    Without output_dir, evidence goes to a temporary directory that is removed
+    again if no violation was written to it.
+    """
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    try:
+        jobs = plan_segments(video_path)
+    except (OSError, ValueError, KeyError) as e:
+        return {"error": str(e)}
+    if not jobs:
+        return {"error": f"No questions recorded in {video_path}"}
+    baseline_path = jobs[0]['path']
+    temporary_output = output_dir is None
+    if temporary_output:
+        output_dir = tempfile.mkdtemp(prefix="replay_violations_")
+
+    start = time.perf_counter()
+    if workers == 1:
+        _init_worker(output_dir)
+        results = [replay_segment(job, baseline_path, stop_on_violation) for job in jobs]
+    else:
+        # spawn: MediaPipe/YOLO must not be inherited across fork
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(output_dir,)) as pool:
+            results = list(pool.map(replay_segment, jobs,
+                                    [baseline_path] * len(jobs), [stop_on_violation] * len(jobs)))
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda r: r['question_number'])
+    session_violations = [f"Q{r['question_number']}: {v['reason']}"
+                          for r in results for v in r['violations']]
+    if temporary_output and not os.listdir(output_dir):
+        os.rmdir(output_dir)
+        output_dir = None
+    total_frames = sum(r['replay']['frames_processed'] for r in results)
+    return {
+        'questions_results': results,
+        'session_video_path': video_path,
+        'total_questions': len(jobs),
+        'completed_questions': len(results),
+        'session_violations': session_violations,
+        'total_violations': len(session_violations),
+        'violation_images_dir': output_dir,
+        'replay_metrics': {
+            'workers': workers,
+            'segments': len(jobs),
+            'frames_processed': total_frames,
+            'wall_seconds': round(elapsed, 3),
+            'fps': round(total_frames / elapsed, 1) if elapsed > 0 else 0.0,
+            'per_segment_fps': [r['replay']['fps'] for r in results]
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the compliance pipeline over a recorded video")
+    parser.add_argument("video", help="Session AVI (with its .index.json) or segmented session directory")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output-dir", default=None, help="Where violation evidence is written")
+    parser.add_argument("--continue-after-violation", action="store_true",
+                        help="Keep auditing a segment after its first violation")
+    args = parser.parse_args()
+
+    result = replay_session(args.video, args.workers, args.output_dir,
+                            stop_on_violation=not args.continue_after_violation)
+    if 'error' in result:
+        print(f"❌ {result['error']}")
+        return
+
+    metrics = result['replay_metrics']
+    print(f"Processed {metrics['frames_processed']} frames in {metrics['wall_seconds']}s "
+          f"({metrics['fps']} fps, {metrics['workers']} workers, {metrics['segments']} segments)")
+    for r in result['questions_results']:
+        reasons = ", ".join(v['reason'] for v in r['violations']) or "no violations"
+        print(f"  Q{r['question_number']}: {r['replay']['frames_processed']} frames, "
+              f"{r['replay']['fps']} fps - {reasons}")
+    print(f"Evidence: {result['violation_images_dir'] or 'none written'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,7 +24,7 @@ class ScoringDashboard:
         if not text or not text.strip():
             return False
         invalid_markers = ["[Could not understand audio]", "[Speech recognition service unavailable]", 
-                          "[Error", "[No audio]", "Audio not clear"]
+                          "[Transcription timed out]", "[Error", "[No audio]", "Audio not clear"]
         return not any(marker in text for marker in invalid_markers)
     
     def decide_hire(self, result):
@@ -199,6 +199,12 @@ class ScoringDashboard:
         
         return decision, reasons
     
+    def display_asr_fallback(self, result):
+        """Warn when the transcript came from a fallback speech recogniser"""
+        reason = result.get('asr', {}).get('fallback_reason')
+        if reason:
+            st.warning(f"⚠️ Transcribed with fallback: {reason}")
+    
     def display_violation_images(self, violations):
         """Display violation images"""
         if not violations:
@@ -210,6 +216,7 @@ class ScoringDashboard:
             violation_reason = violation.get('reason', 'Unknown violation')
             violation_time = violation.get('timestamp', 0)
             image_path = violation.get('image_path')
+            clip_path = violation.get('clip_path')
             
             col1, col2 = st.columns([2, 3])
             
@@ -218,6 +225,8 @@ class ScoringDashboard:
                     st.image(image_path, caption=f"Violation #{idx+1}", use_container_width=True)
                 else:
                     st.error("Image not available")
+                if clip_path and os.path.exists(clip_path):
+                    st.video(clip_path)
             
             with col2:
                 st.markdown(f"""
@@ -260,6 +269,7 @@ class ScoringDashboard:
                 st.text_area("", result['transcript'], height=100, disabled=True, label_visibility="collapsed")
             else:
                 st.error(result.get('transcript', 'No transcript'))
+            self.display_asr_fallback(result)
             
             # Main metrics (4 columns - NO fake metrics)
             m1, m2, m3, m4 = st.columns(4)
@@ -570,6 +580,7 @@ class ScoringDashboard:
                         st.text_area("", r['transcript'], height=80, disabled=True, key=f"t_{i}", label_visibility="collapsed")
                     else:
                         st.error(r.get('transcript', 'No transcript'))
+                    self.display_asr_fallback(r)
                     
                     # Main metrics
                     m1, m2, m3, m4 = st.columns(4)
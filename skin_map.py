@@ -0,0 +1,76 @@
+"""
+Per-frame skin map - PERFORMANCE OPTIMIZED
+One LUT-classified skin mask per (downscaled) frame plus its integral image,
+so the skin ratio of any rectangle is an O(1) lookup
+"""
+
+import cv2
+import numpy as np
+
+# HSV skin ranges of the original per-region skin-tone check (either range matches)
+SKIN_HSV_RANGES = (
+    ((0, 20, 70), (20, 255, 255)),
+    ((0, 20, 0), (20, 150, 255)),
+)
+
+LUT_BITS = 5  # Quantization per BGR channel (32 levels -> 32K-entry table)
+
+_skin_lut = None
+
+
+def skin_lut():
+    """Quantized BGR -> skin (0/1) lookup table, built once from SKIN_HSV_RANGES"""
+    global _skin_lut
+    if _skin_lut is None:
+        levels = 1 << LUT_BITS
+        step = 256 // levels
+        centers = (np.arange(levels, dtype=np.uint8) * step + step // 2).astype(np.uint8)
+        b, g, r = np.meshgrid(centers, centers, centers, indexing="ij")
+        grid = np.stack([b, g, r], axis=-1).reshape(-1, 1, 3)
+
+        hsv = cv2.cvtColor(grid, cv2.COLOR_BGR2HSV)
+        mask = np.zeros(len(grid), dtype=np.uint8)
+        for lower, upper in SKIN_HSV_RANGES:
+            in_range = cv2.inRange(hsv, np.array(lower, np.uint8), np.array(upper, np.uint8))
+            mask |= (in_range.reshape(-1) > 0).astype(np.uint8)
+        _skin_lut = mask
+    return _skin_lut
+
+
+class SkinMap:
+    """Integral image of a frame's skin mask, queried in full-resolution coordinates"""
+
+    DOWNSCALE = 4
+
+    def __init__(self, small_frame, full_shape):
+        self.full_h, self.full_w = full_shape[:2]
+        small_h, small_w = small_frame.shape[:2]
+        self.scale_x = small_w / self.full_w
+        self.scale_y = small_h / self.full_h
+
+        shift = 8 - LUT_BITS
+        q = (small_frame >> shift).astype(np.intp)
+        index = (q[..., 0] << (2 * LUT_BITS)) | (q[..., 1] << LUT_BITS) | q[..., 2]
+        self.mask = skin_lut()[index]
+        self.integral = cv2.integral(self.mask, sdepth=cv2.CV_32S)
+
+    @classmethod
+    def from_views(cls, views):
+        """Build from a FrameViews (reuses its cached downscaled frame)"""
+        h, w = views.frame.shape[:2]
+        small = views.resized(max(1, w // cls.DOWNSCALE), max(1, h // cls.DOWNSCALE))
+        return cls(small, views.frame.shape)
+
+    def ratio(self, x0, y0, x1, y1):
+        """Fraction of skin pixels in the full-resolution rectangle [x0, x1) x [y0, y1)"""
+        sx0 = int(round(max(0, x0) * self.scale_x))
+        sx1 = int(round(min(self.full_w, x1) * self.scale_x))
+        sy0 = int(round(max(0, y0) * self.scale_y))
+        sy1 = int(round(min(self.full_h, y1) * self.scale_y))
+        area = (sx1 - sx0) * (sy1 - sy0)
+        if area <= 0:
+            return 0.0
+
+        ii = self.integral
+        total = ii[sy1, sx1] - ii[sy0, sx1] - ii[sy1, sx0] + ii[sy0, sx0]
+        return float(total) / area
@@ -0,0 +1,346 @@
+"""
+Video sources - one capture handle per session
+Webcam, video file, synthetic generator and WebRTC frames behind one
+interface. Frames carry source timestamps, which drive session timing
+(live sources use the wall clock, files and synthetic sources use media time).
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class VideoSource:
+    """Base interface: open once, read (ok, frame, timestamp), release at session end"""
+
+    kind = "source"
+    wall_clock = True  # now() follows time.time() rather than media time
+
+    def __init__(self):
+        self._opened = False
+        self.ended = False  # True once the source can produce no more frames
+        self.last_timestamp = None
+        self.frames_read = 0
+
+    # ---- backend hooks ----
+
+    def _open(self):
+        return True
+
+    def _read(self):
+        """Return (ok, frame, timestamp)"""
+        raise NotImplementedError
+
+    def _release(self):
+        pass
+
+    # ---- public API ----
+
+    def open(self):
+        """Open the handle if needed (idempotent, so every phase can call it)"""
+        if not self._opened:
+            self._opened = bool(self._open())
+        return self
+
+    def isOpened(self):
+        return self._opened
+
+    def read_frame(self):
+        """Next (ok, frame, timestamp)"""
+        if not self._opened or self.ended:
+            return False, None, None
+        ok, frame, timestamp = self._read()
+        if ok:
+            self.frames_read += 1
+            self.last_timestamp = timestamp
+        return ok, frame, timestamp
+
+    def read(self):
+        """cv2.VideoCapture-compatible read()"""
+        ok, frame, _ = self.read_frame()
+        return ok, frame
+
+    def now(self):
+        """Current time on this source's clock"""
+        if self.wall_clock:
+            return time.time()
+        return self.last_timestamp if self.last_timestamp is not None else 0.0
+
+    def release(self):
+        if self._opened:
+            self._release()
+        self._opened = False
+
+
+class WebcamSource(VideoSource):
+    """Local camera via cv2.VideoCapture"""
+
+    kind = "webcam"
+
+    def __init__(self, index=0, width=None, height=None, fps=None):
+        super().__init__()
+        self.index = index
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._cap = None
+
+    def _open(self):
+        self._cap = cv2.VideoCapture(self.index)
+        if self.width:
+            self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            self._cap.set(cv2.CAP_PROP_FPS, self.fps)
+        return self._cap.isOpened()
+
+    def _read(self):
+        ok, frame = self._cap.read()
+        return ok, frame, time.time()
+
+    def _release(self):
+        self._cap.release()
+
+
+class FileSource(VideoSource):
+    """
+    Video file; timestamps are media time (frame_index / fps).
+    realtime=True paces reads to the file's frame rate (a stand-in camera);
+    realtime=False reads as fast as possible (offline replay).
+    """
+
+    kind = "file"
+    wall_clock = False
+
+    def __init__(self, path, start_frame=0, end_frame=None, realtime=True, loop=False, fps=None):
+        super().__init__()
+        self.path = path
+        self.start_frame = int(start_frame or 0)
+        self.end_frame = end_frame
+        self.realtime = realtime
+        self.loop = loop
+        self.fps = fps
+        self.frame_index = self.start_frame
+        self._cap = None
+        self._pace_origin = None  # (wall time, media time) of the first paced frame
+
+    def _open(self):
+        self._cap = cv2.VideoCapture(self.path)
+        if not self._cap.isOpened():
+            return False
+        self.fps = self.fps or self._cap.get(cv2.CAP_PROP_FPS) or 15.0
+        if self.start_frame:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        return True
+
+    def _rewind(self):
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        self.frame_index = self.start_frame
+
+    def _read(self):
+        if self.end_frame is not None and self.frame_index >= self.end_frame:
+            if not self.loop:
+                self.ended = True
+                return False, None, None
+            self._rewind()
+
+        ok, frame = self._cap.read()
+        if not ok and self.loop and self.frame_index > self.start_frame:
+            self._rewind()
+            ok, frame = self._cap.read()
+        if not ok:
+            self.ended = True
+            return False, None, None
+
+        timestamp = self.frame_index / self.fps
+        self.frame_index += 1
+
+        if self.realtime:
+            if self._pace_origin is None or timestamp < self._pace_origin[1]:
+                self._pace_origin = (time.time(), timestamp)
+            due = self._pace_origin[0] + (timestamp - self._pace_origin[1])
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -1.0:
+                # Nobody read for a while (e.g. between phases): resume pacing from now
+                self._pace_origin = (time.time(), timestamp)
+        return True, frame, timestamp
+
+    def _release(self):
+        self._cap.release()
+
+
+class SyntheticSource(VideoSource):
+    """Generated test pattern (moving bar over a gradient) for camera-less servers and tests"""
+
+    kind = "synthetic"
+    wall_clock = False
+
+    def __init__(self, width=640, height=480, fps=15.0, realtime=True, max_frames=None):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.realtime = realtime
+        self.max_frames = max_frames
+        self.frame_index = 0
+        self._background = None
+        self._wall_start = None
+
+    def _open(self):
+        ramp = np.linspace(40, 200, self.width, dtype=np.float32).astype(np.uint8)
+        self._background = np.repeat(np.repeat(ramp[None, :, None], self.height, axis=0), 3, axis=2)
+        return True
+
+    def _read(self):
+        if self.max_frames is not None and self.frame_index >= self.max_frames:
+            self.ended = True
+            return False, None, None
+
+        timestamp = self.frame_index / self.fps
+        if self.realtime:
+            if self._wall_start is None:
+                self._wall_start = time.time()
+            delay = self._wall_start + timestamp - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        # Consumers keep frames, so each one is a fresh array
+        frame = self._background.copy()
+        bar_w = max(1, self.width // 10)
+        x = (self.frame_index * 4) % max(1, self.width - bar_w)
+        frame[:, x:x + bar_w] = (0, 128, 255)
+        self.frame_index += 1
+        return True, frame, timestamp
+
+
+def fit_within(width, height, max_width, max_height):
+    """Largest (w, h) within the limits at the same aspect ratio; never upscales, even sizes for YUV"""
+    scale = min(1.0, max_width / width, max_height / height)
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def av_frame_to_bgr(frame, max_width=None, max_height=None):
+    """PyAV VideoFrame -> BGR ndarray; downscale and colour conversion in one swscale pass"""
+    width, height = frame.width, frame.height
+    if max_width and max_height:
+        width, height = fit_within(width, height, max_width, max_height)
+    if (width, height) == (frame.width, frame.height):
+        return frame.to_ndarray(format="bgr24")
+    return frame.reformat(width=width, height=height, format="bgr24", interpolation="AREA").to_ndarray()
+
+
+class WebRTCFrameMailbox:
+    """
+    Newest raw av.VideoFrame from a WebRTC track. post() runs in the media thread
+    and only swaps a reference; sample() converts the frame a consumer picks, in the
+    consumer's thread, so frames nobody analyses are never decoded to BGR
+    """
+
+    def __init__(self, max_width=None, max_height=None):
+        self.max_width = max_width
+        self.max_height = max_height
+        self.received = 0
+        self.converted = 0
+        self._raw = None  # (seq, timestamp, av.VideoFrame)
+        self._sampled = None  # (seq, timestamp, bgr) of the last conversion
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def post(self, frame, timestamp):
+        with self._cond:
+            self.received += 1
+            self._raw = (self.received, timestamp, frame)
+            self._cond.notify_all()
+
+    def close(self):
+        """Track ended: wake waiting consumers; sample() stops waiting for new frames"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def _convert(self, raw):
+        sampled = self._sampled
+        if sampled is not None and sampled[0] == raw[0]:
+            return sampled
+        seq, timestamp, frame = raw
+        sampled = (seq, timestamp, av_frame_to_bgr(frame, self.max_width, self.max_height))
+        self._sampled = sampled
+        self.converted += 1
+        return sampled
+
+    def sample(self, after_seq=0, timeout=None, not_before=None):
+        """
+        Wait for a frame newer than after_seq (and, if given, timestamped at or after
+        not_before) and convert it: (seq, timestamp, bgr) or None. Frames replaced
+        while waiting are skipped without conversion.
+        """
+        def ready():
+            if self.received <= after_seq:
+                return False
+            return not_before is None or self._raw[1] >= not_before
+
+        with self._cond:
+            self._cond.wait_for(lambda: ready() or self.closed, timeout=timeout)
+            if not ready():
+                return None
+            raw = self._raw
+        return self._convert(raw)
+
+    def latest(self):
+        """Newest frame converted on demand (non-blocking), or None before the first frame"""
+        raw = self._raw
+        return self._convert(raw) if raw is not None else None
+
+    def stats(self):
+        return {'received': self.received, 'converted': self.converted,
+                'skipped': self.received - self.converted}
+
+
+class WebRTCMailboxSource(VideoSource):
+    """
+    Browser camera frames from a WebRTCFrameMailbox, sampled at max_fps. Each read
+    waits for the next frame due on that cadence and converts only that frame; the
+    rest (e.g. every other frame of a 30 fps stream at 15 fps) are never decoded to BGR
+    """
+
+    kind = "webrtc"
+
+    def __init__(self, mailbox, timeout=1.0, max_fps=None):
+        super().__init__()
+        self.mailbox = mailbox
+        self.timeout = timeout
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self._seq = 0
+        self._due = None
+
+    def _read(self):
+        # Accept frames up to a quarter interval early so camera jitter doesn't halve the rate
+        not_before = self._due - self.interval / 4 if self._due is not None else None
+        sampled = self.mailbox.sample(self._seq, self.timeout, not_before)
+        if sampled is None:
+            if self.mailbox.closed:
+                self.ended = True
+            return False, None, None
+        self._seq, timestamp, frame = sampled
+        if self.interval:
+            # Fixed grid of due times; resynchronise after a stall instead of bursting
+            self._due = max(self._due or timestamp, timestamp - self.interval) + self.interval
+        return True, frame, timestamp
+
+
+def create_video_source(kind="webcam", **kwargs):
+    """Build a source by name: webcam | file | synthetic | webrtc"""
+    if kind == "webcam":
+        return WebcamSource(**kwargs)
+    if kind == "file":
+        return FileSource(**kwargs)
+    if kind == "synthetic":
+        return SyntheticSource(**kwargs)
+    if kind == "webrtc":
+        return WebRTCMailboxSource(**kwargs)
+    raise ValueError(f"Unknown video source: {kind}")
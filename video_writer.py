@@ -0,0 +1,389 @@
+"""
+Asynchronous session video writers - PERFORMANCE OPTIMIZED
+Encodes frames on a dedicated thread so the recording loop never waits on the codec.
+AsyncVideoWriter writes one file plus a sidecar index of each question's frame range;
+SegmentedVideoWriter writes one seekable file per question plus a keyframe index.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from bisect import bisect_right
+
+import cv2
+
+try:
+    import av
+    AV_AVAILABLE = True
+except:
+    AV_AVAILABLE = False
+
+
+class AsyncVideoWriter:
+    """cv2.VideoWriter wrapper with a bounded queue, drop policy and flush on release"""
+
+    DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, path, fourcc="XVID", fps=15.0, frame_size=(640, 480),
+                 queue_size=30, drop_policy="drop_oldest"):
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {self.DROP_POLICIES}")
+
+        self.path = path
+        self.fps = fps
+        self.frame_size = frame_size
+        self.drop_policy = drop_policy
+        self._fourcc = fourcc
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self.segment_labels = {}  # segment (question number) -> question text, for the index
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.encode_time = 0.0   # Spent on the writer thread
+        self.enqueue_time = 0.0  # Spent by callers of write()
+
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    # ---- backend hooks (overridden by SegmentedVideoWriter) ----
+
+    def _open(self):
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self._fourcc),
+                                       self.fps, self.frame_size)
+        self.index_path = os.path.splitext(self.path)[0] + ".index.json"
+        self.segments = []  # Frame ranges [start_frame, end_frame) of each question in the file
+        self._frame_index = 0
+
+    def _encode(self, frame, timestamp, segment):
+        self._writer.write(frame)
+        if not self.segments or self.segments[-1]['question_number'] != segment:
+            self.segments.append({'question_number': segment, 'start_frame': self._frame_index,
+                                  'end_frame': self._frame_index, 'start_time': timestamp})
+        self._frame_index += 1
+        self.segments[-1]['end_frame'] = self._frame_index
+        self.segments[-1]['end_time'] = timestamp
+
+    def _close(self):
+        self._writer.release()
+        for seg in self.segments:
+            seg['question_text'] = self.segment_labels.get(seg['question_number'], '')
+        with open(self.index_path, "w") as f:
+            json.dump({'path': self.path, 'fps': self.fps, 'frame_size': list(self.frame_size),
+                       'segments': self.segments}, f, indent=2)
+
+    # ---- public API ----
+
+    def isOpened(self):
+        return self._writer.isOpened()
+
+    def label_segment(self, segment, question_text):
+        """Question text recorded with the segment in the sidecar index"""
+        self.segment_labels[segment] = question_text
+
+    def write(self, frame, timestamp=None, segment=None):
+        """Queue a frame for encoding; never blocks unless drop_policy is 'block'"""
+        if self._closed:
+            return
+
+        start = time.perf_counter()
+        item = (frame, timestamp if timestamp is not None else time.time(), segment)
+        if self.drop_policy == "block":
+            self._queue.put(item)
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                if self.drop_policy == "drop_newest":
+                    self.frames_dropped += 1
+                else:
+                    try:
+                        self._queue.get_nowait()
+                        self._queue.task_done()
+                        self.frames_dropped += 1
+                    except queue.Empty:
+                        pass
+                    try:
+                        self._queue.put_nowait(item)
+                    except queue.Full:
+                        self.frames_dropped += 1
+        self.enqueue_time += time.perf_counter() - start
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+
+            frame, timestamp, segment = item
+            start = time.perf_counter()
+            try:
+                # Encoders silently drop or reject frames whose size doesn't match
+                if (frame.shape[1], frame.shape[0]) != self.frame_size:
+                    frame = cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
+                self._encode(frame, timestamp, segment)
+                self.frames_written += 1
+            except Exception as e:
+                print(f"⚠️ Video encode error: {e}")
+            finally:
+                self.encode_time += time.perf_counter() - start
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait until every queued frame has been encoded"""
+        self._queue.join()
+
+    def release(self, timeout=10.0):
+        """Flush queued frames, stop the writer thread and close the output"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        try:
+            self._close()
+        except Exception as e:
+            print(f"⚠️ Video close error: {e}")
+
+    def metrics(self):
+        return {
+            'frames_written': self.frames_written,
+            'frames_dropped': self.frames_dropped,
+            'queue_depth': self._queue.qsize(),
+            'encode_ms_total': round(self.encode_time * 1000, 1),
+            'enqueue_ms_total': round(self.enqueue_time * 1000, 1),
+            'loop_time_freed_ms': round((self.encode_time - self.enqueue_time) * 1000, 1)
+        }
+
+
+class SegmentedVideoWriter(AsyncVideoWriter):
+    """
+    PyAV writer that starts a new file per segment (question) and writes a
+    JSON sidecar index of keyframe times/byte offsets and violation timestamps
+    """
+
+    def __init__(self, output_dir, codec="libx264", preset="veryfast", container="mp4",
+                 keyframe_interval=15, fps=15.0, frame_size=(640, 480),
+                 queue_size=30, drop_policy="drop_oldest"):
+        if not AV_AVAILABLE:
+            raise RuntimeError("PyAV is not installed - segmented video unavailable")
+
+        self.output_dir = output_dir
+        self.codec = codec
+        self.preset = preset
+        self.container_format = container
+        self.keyframe_interval = keyframe_interval
+        self.index_path = os.path.join(output_dir, "index.json")
+        super().__init__(self.index_path, fps=fps, frame_size=frame_size,
+                         queue_size=queue_size, drop_policy=drop_policy)
+
+    def _open(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.segments = []
+        self.violations = []
+        self._segment = None  # Currently open segment (dict with container/stream)
+
+    def isOpened(self):
+        return True
+
+    def _start_segment(self, segment, timestamp):
+        path = os.path.join(self.output_dir, f"question_{segment}.{self.container_format}")
+        container = av.open(path, mode="w")
+        options = {"preset": self.preset} if self.preset else {}
+        stream = container.add_stream(self.codec, rate=int(self.fps), options=options)
+        stream.width, stream.height = self.frame_size
+        stream.pix_fmt = "yuv420p"
+        stream.codec_context.gop_size = self.keyframe_interval
+
+        self._segment = {
+            'key': segment,
+            'path': path,
+            'container': container,
+            'stream': stream,
+            'start_time': timestamp,
+            'end_time': timestamp,
+            'last_pts': -1,
+            'frames': 0
+        }
+
+    def _finish_segment(self):
+        seg = self._segment
+        if seg is None:
+            return
+        self._segment = None
+
+        for packet in seg['stream'].encode():
+            seg['container'].mux(packet)
+        seg['container'].close()
+
+        self.segments.append({
+            'question_number': seg['key'],
+            'question_text': self.segment_labels.get(seg['key'], ''),
+            'path': seg['path'],
+            'start_time': seg['start_time'],
+            'end_time': seg['end_time'],
+            'frames': seg['frames'],
+            'keyframes': self._index_keyframes(seg['path'])
+        })
+
+    @staticmethod
+    def _index_keyframes(path):
+        """Demux (no decode) the finished segment to record keyframe times and byte offsets"""
+        keyframes = []
+        try:
+            with av.open(path) as container:
+                stream = container.streams.video[0]
+                for packet in container.demux(stream):
+                    if packet.pts is None or not packet.is_keyframe:
+                        continue
+                    keyframes.append({
+                        'time': round(float(packet.pts * packet.time_base), 3),
+                        'byte_offset': packet.pos
+                    })
+        except Exception as e:
+            print(f"⚠️ Keyframe indexing failed for {path}: {e}")
+        keyframes.sort(key=lambda k: k['time'])
+        return keyframes
+
+    def _encode(self, frame, timestamp, segment):
+        if self._segment is None or self._segment['key'] != segment:
+            self._finish_segment()
+            self._start_segment(segment, timestamp)
+
+        seg = self._segment
+        # Presentation time follows capture timestamps (in 1/fps units, strictly increasing)
+        pts = max(int(round((timestamp - seg['start_time']) * self.fps)), seg['last_pts'] + 1)
+        video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
+        video_frame.pts = pts
+        for packet in seg['stream'].encode(video_frame):
+            seg['container'].mux(packet)
+
+        seg['last_pts'] = pts
+        seg['end_time'] = timestamp
+        seg['frames'] += 1
+
+    def mark_violation(self, question_number, timestamp, reason=""):
+        """Record a violation (absolute capture time) for the sidecar index"""
+        self.violations.append({
+            'question_number': question_number,
+            'timestamp': timestamp,
+            'reason': reason
+        })
+
+    def _close(self):
+        self._finish_segment()
+        self.write_index()
+
+    def locate(self, question_number, timestamp):
+        """Segment path, segment-relative time and preceding keyframe for an absolute timestamp"""
+        for seg in self.segments:
+            if seg['question_number'] != question_number:
+                continue
+            rel_time = max(0.0, timestamp - seg['start_time'])
+            times = [k['time'] for k in seg['keyframes']]
+            i = bisect_right(times, rel_time) - 1
+            keyframe = seg['keyframes'][i] if i >= 0 else None
+            return {
+                'segment_path': seg['path'],
+                'segment_time': round(rel_time, 3),
+                'keyframe_time': keyframe['time'] if keyframe else 0.0,
+                'byte_offset': keyframe['byte_offset'] if keyframe else 0
+            }
+        return None
+
+    def write_index(self):
+        """Write the sidecar index mapping questions/violations to segments and keyframes"""
+        violations = []
+        for v in self.violations:
+            entry = dict(v)
+            entry.update(self.locate(v['question_number'], v['timestamp']) or {})
+            violations.append(entry)
+
+        index = {
+            'codec': self.codec,
+            'preset': self.preset,
+            'fps': self.fps,
+            'frame_size': list(self.frame_size),
+            'keyframe_interval': self.keyframe_interval,
+            'segments': self.segments,
+            'violations': violations
+        }
+        with open(self.index_path, "w") as f:
+            json.dump(index, f, indent=2)
+        return self.index_path
+
+
+def extract_violation_clip(index_path, violation, out_path, before=2.0, after=3.0):
+    """
+    Cut a short clip around an indexed violation without re-encoding:
+    seek to the preceding keyframe and stream-copy packets until the end time
+    """
+    if not AV_AVAILABLE:
+        return None
+
+    with open(index_path) as f:
+        index = json.load(f)
+
+    if isinstance(violation, int):
+        violation = index['violations'][violation]
+
+    start = max(0.0, violation['segment_time'] - before)
+    end = violation['segment_time'] + after
+
+    with av.open(violation['segment_path']) as src, av.open(out_path, mode="w") as dst:
+        in_stream = src.streams.video[0]
+        if hasattr(dst, "add_stream_from_template"):  # PyAV >= 14
+            out_stream = dst.add_stream_from_template(in_stream)
+        else:
+            out_stream = dst.add_stream(template=in_stream)
+        src.seek(int(start / in_stream.time_base), stream=in_stream, backward=True, any_frame=False)
+
+        offset = None
+        for packet in src.demux(in_stream):
+            if packet.pts is None:
+                continue
+            if float(packet.pts * packet.time_base) > end:
+                break
+            if offset is None:
+                offset = packet.dts if packet.dts is not None else packet.pts
+            packet.pts -= offset
+            if packet.dts is not None:
+                packet.dts -= offset
+            packet.stream = out_stream
+            dst.mux(packet)
+
+    return out_path
+
+
+def write_clip(frames, timestamps, path, codec="libx264"):
+    """
+    Encode a short clip (e.g. a ClipRingBuffer snapshot) with the frame rate
+    taken from its capture timestamps; falls back to cv2 when PyAV is missing
+    """
+    if len(frames) == 0:
+        return None
+
+    height, width = frames[0].shape[:2]
+    span = float(timestamps[-1] - timestamps[0]) if len(timestamps) > 1 else 0.0
+    fps = (len(frames) - 1) / span if span > 0 else 15.0
+
+    if AV_AVAILABLE:
+        with av.open(path, mode="w") as container:
+            stream = container.add_stream(codec, rate=max(1, int(round(fps))))
+            stream.width, stream.height = width, height
+            stream.pix_fmt = "yuv420p"
+            for frame in frames:
+                for packet in stream.encode(av.VideoFrame.from_ndarray(frame, format="bgr24")):
+                    container.mux(packet)
+            for packet in stream.encode():
+                container.mux(packet)
+    else:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
+    return path